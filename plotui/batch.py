@@ -0,0 +1,96 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from common import PlotArgs
+from model.grapher import ModelGrapher
+from model.store import get_result_store
+
+
+def run_job(job, output_dir='.'):
+    """
+    Renders a single job from a job file and returns the names of the
+    files written. Only the Agg backend is used, so no display is needed.
+    Plot data is shared with the program and other jobs through the
+    result store.
+    """
+    grapher = ModelGrapher(store=get_result_store())
+
+    if 'title' in job:
+        grapher.set_axes_title(job['title'])
+    if 'xlabel' in job:
+        grapher.set_xlabel(job['xlabel'])
+    if 'ylabel' in job:
+        grapher.set_ylabel(job['ylabel'])
+
+    for count, plot in enumerate(job['plots']):
+        key = str(count)
+        grapher.add_plot(key, plot['type'])
+        if 'constants' in plot:
+            grapher.set_constant_vals(key, plot['constants'])
+        grapher.update_plot(key, PlotArgs(
+            plot['xvar'], plot.get('xmin'), plot.get('xmax'),
+            plot['yvar'], plot.get('ymin'), plot.get('ymax'),
+            ))
+
+    # Autoscale any limits that aren't given
+    limits = job.get('limits', [None, None, None, None])
+    grapher.set_axes_limits(*limits)
+
+    file_names = []
+    name = os.path.join(output_dir, job['name'])
+    if job.get('png', True):
+        grapher.export_png(name + '.png')
+        file_names.append(name + '.png')
+    if job.get('dat', True):
+        file_names += grapher.export_dat(name + '.dat',
+                                         job.get('share_x', True))
+    return file_names
+
+
+def run_jobs(jobs, output_dir='.', workers=None):
+    """
+    Renders independent jobs across a pool of processes. Returns a list
+    of (name, files, error) tuples in the same order as the jobs.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_job, job, output_dir) for job in jobs]
+        for job, future in zip(jobs, futures):
+            try:
+                results.append((job['name'], future.result(), None))
+            except Exception as e:
+                results.append((job['name'], [], e))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Render plots from a job file without a display.")
+    parser.add_argument('job_file', help="JSON file describing the jobs")
+    parser.add_argument('-o', '--output-dir', default='.',
+        help="directory to write the output files to")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+        help="number of processes to use (default: number of CPUs)")
+    args = parser.parse_args(argv)
+
+    with open(args.job_file) as f:
+        jobs = json.load(f)['jobs']
+
+    failed = 0
+    for name, file_names, error in run_jobs(jobs, args.output_dir,
+                                            args.workers):
+        if error is None:
+            print(f"{name}: wrote {', '.join(file_names)}")
+        else:
+            failed += 1
+            print(f"{name}: failed ({error!r})", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,341 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import matplotlib
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from common import PlotType, PlotArgs
+from model.grapher import ModelGrapher
+from model.store import ResultStore
+from model.plotfunctions.model1 import Model1PlotFunction
+from model.plotfunctions.model2 import Model2
+from model.sweep import sweep_model2_batch
+
+
+class Benchmark(object):
+    """
+    A timed operation. setup() is called before every repeat and is not
+    timed, its return value is passed to run() and then to teardown().
+    """
+    def __init__(self, name, run, setup=None, params=None, repeat=5,
+            teardown=None):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.teardown = teardown
+        self.params = params if params is not None else {}
+        self.repeat = repeat
+
+    def time(self):
+        times = []
+        for count in range(self.repeat):
+            state = self.setup() if self.setup is not None else None
+            try:
+                start = time.perf_counter()
+                self.run(state)
+                times.append(time.perf_counter() - start)
+            finally:
+                if self.teardown is not None:
+                    self.teardown(state)
+        return {
+            'min': min(times),
+            'median': statistics.median(times),
+            'repeat': self.repeat,
+            'params': self.params,
+            }
+
+
+class MemoryStore(dict):
+    """
+    A store which keeps every entry put in it in memory, to collect the
+    data written by a grapher.
+    """
+    def put(self, key, entry):
+        self[key] = entry
+
+
+########################################################################
+#                              Benchmarks                              #
+########################################################################
+
+def model1_tw(tgmax):
+    def setup():
+        model = Model1PlotFunction()
+        model.restore_defaults()
+        return model
+
+    def run(model):
+        xdata = model.get_xdata('tg', 0, tgmax)
+        model.get_ydata('tw', None, None, xdata)
+
+    return Benchmark(f'model1_tw[tgmax={tgmax}]', run, setup,
+                     {'tgmax': tgmax})
+
+
+def model2_x_is_N(N_max):
+    def setup():
+        model = Model2()
+        model.restore_defaults()
+        return model
+
+    def run(model):
+        model._x_is_N(1, N_max, None)
+
+    return Benchmark(f'model2_x_is_N[N={N_max}]', run, setup,
+                     {'N_max': N_max}, repeat=3)
+
+
+def model2_batch(runs, N_max):
+    # Constant sets spread over the defaults, simulated in lockstep
+    rng = np.random.default_rng(0)
+    grid = np.column_stack([
+        rng.uniform(100, 500, runs), rng.uniform(4, 6, runs),
+        rng.uniform(30, 50, runs), rng.integers(1, 30, runs),
+        rng.integers(1, 30, runs), rng.integers(60, 180, runs),
+        np.full(runs, 5)])
+
+    def run(state):
+        sweep_model2_batch(grid, 1, N_max)
+
+    return Benchmark(f'model2_batch[runs={runs}]', run,
+                     params={'runs': runs, 'N_max': N_max}, repeat=3)
+
+
+def _grapher_with_plots(plots, points):
+    grapher = ModelGrapher()
+    for count in range(plots):
+        key = str(count)
+        grapher.add_plot(key, PlotType.MODEL_1)
+        grapher.update_plot(key, PlotArgs('tg', count, count + points / 10,
+                                          'tw'))
+    return grapher
+
+
+def grapher_update_plot(plots, points):
+    def setup():
+        grapher = _grapher_with_plots(plots, points)
+        # Every update is recalculated rather than read from the cache
+        grapher._plot_data_cache.clear()
+        return grapher
+
+    def run(grapher):
+        for count in range(plots):
+            grapher.update_plot(str(count), PlotArgs('tg', count,
+                count + points / 10, 'tw'))
+
+    return Benchmark(f'grapher_update_plot[plots={plots}]', run, setup,
+                     {'plots': plots, 'points': points})
+
+
+def grapher_axes_limits(plots, points):
+    def setup():
+        return _grapher_with_plots(plots, points)
+
+    def run(grapher):
+        grapher._calc_all_axes_limits()
+
+    return Benchmark(f'grapher_axes_limits[plots={plots}]', run, setup,
+                     {'plots': plots, 'points': points}, repeat=20)
+
+
+def grapher_load_stored(plots, N_max):
+    # Model 2 plots whose data was stored by an earlier session. The data
+    # is only calculated once, and written to a new store for each repeat.
+    args = [PlotArgs('N', 1, N_max + count, 'tw') for count in range(plots)]
+    entries = MemoryStore()
+
+    def setup():
+        if len(entries) == 0:
+            grapher = ModelGrapher(store=entries)
+            for count in range(plots):
+                grapher.add_plot(str(count), PlotType.MODEL_2)
+                grapher.update_plot(str(count), args[count])
+
+        directory = tempfile.TemporaryDirectory()
+        store = ResultStore(directory.name)
+        for key, entry in entries.items():
+            store.put(key, entry)
+        grapher = ModelGrapher(store=store)
+        for count in range(plots):
+            grapher.add_plot(str(count), PlotType.MODEL_2)
+        return grapher, directory
+
+    def run(state):
+        grapher, directory = state
+        for count in range(plots):
+            grapher.update_plot(str(count), args[count])
+
+    def teardown(state):
+        state[1].cleanup()
+
+    return Benchmark(f'grapher_load_stored[plots={plots}]', run, setup,
+                     {'plots': plots, 'N_max': N_max}, teardown=teardown)
+
+
+def export_dat(plots, points):
+    # Lines of exactly points points, offset so that their x data differs
+    def setup():
+        grapher = ModelGrapher()
+        for count in range(plots):
+            key = str(count)
+            xdata = np.linspace(count, count + 10, points)
+            grapher.add_plot(key, PlotType.STRAIGHT_LINE)
+            grapher.set_plot_data(key, xdata, np.sin(xdata))
+        return grapher, tempfile.TemporaryDirectory()
+
+    def run(state):
+        grapher, directory = state
+        grapher.export_dat(os.path.join(directory.name, 'benchmark.dat'))
+
+    def teardown(state):
+        state[1].cleanup()
+
+    return Benchmark(f'export_dat[points={points}]', run, setup,
+                     {'plots': plots, 'points': points}, teardown=teardown)
+
+
+def render_agg(plots, points):
+    def setup():
+        return FigureCanvasAgg(_grapher_with_plots(plots, points)
+                               .get_plot_figure())
+
+    def run(canvas):
+        canvas.draw()
+
+    return Benchmark(f'render_agg[plots={plots}]', run, setup,
+                     {'plots': plots, 'points': points})
+
+
+def render_agg_large(points):
+    # A single long line, which is drawn decimated
+    def setup():
+        grapher = ModelGrapher()
+        grapher.add_plot('0', PlotType.STRAIGHT_LINE)
+        xdata = np.linspace(0, 1, points)
+        grapher.set_plot_data('0', xdata, np.sin(xdata * 1000))
+        return FigureCanvasAgg(grapher.get_plot_figure())
+
+    def run(canvas):
+        canvas.draw()
+
+    return Benchmark(f'render_agg_large[points={points}]', run, setup,
+                     {'points': points})
+
+
+def startup_import(module):
+    # Timed in a new interpreter, so its startup time is included
+    def run(state):
+        subprocess.run([sys.executable, '-c', f'import {module}'], check=True,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+
+    return Benchmark(f'startup_import[{module}]', run,
+                     params={'module': module})
+
+
+def get_benchmarks(quick=False):
+    scale = 1 if quick else 10
+    benchmarks = []
+    for module in ('views.view', 'model.grapher'):
+        benchmarks.append(startup_import(module))
+    for tgmax in (120, 1200 * scale):
+        benchmarks.append(model1_tw(tgmax))
+    for N_max in (100, 400, 1600 * scale):
+        benchmarks.append(model2_x_is_N(N_max))
+    benchmarks.append(model2_batch(100 * scale, 300))
+    benchmarks.append(grapher_update_plot(5 * scale, 1000))
+    benchmarks.append(grapher_axes_limits(5 * scale, 1000 * scale))
+    benchmarks.append(grapher_load_stored(20, 400 * scale))
+    for points in (1000, 10000 * scale):
+        benchmarks.append(export_dat(2, points))
+    benchmarks.append(render_agg(5 * scale, 1000 * scale))
+    benchmarks.append(render_agg_large(100000 * scale))
+    return benchmarks
+
+
+########################################################################
+#                               Results                                #
+########################################################################
+
+def run_benchmarks(benchmarks, name_filter=None):
+    results = {}
+    for benchmark in benchmarks:
+        if name_filter is not None and name_filter not in benchmark.name:
+            continue
+        results[benchmark.name] = benchmark.time()
+        print(f"{benchmark.name:<40} {results[benchmark.name]['min']:.6f} s")
+    return {
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'matplotlib': matplotlib.__version__,
+            'platform': platform.platform(),
+            },
+        'results': results,
+        }
+
+
+def compare(report, baseline, tolerance):
+    """
+    Compares the minimum times of a report against a baseline report and
+    returns the names of the benchmarks which are slower by more than the
+    tolerance, as a fraction of the baseline time.
+    """
+    regressions = []
+    for name, result in report['results'].items():
+        if name not in baseline['results']:
+            continue
+        ratio = result['min'] / baseline['results'][name]['min']
+        result['baseline_ratio'] = ratio
+        status = 'REGRESSION' if ratio > 1 + tolerance else 'ok'
+        if status == 'REGRESSION':
+            regressions.append(name)
+        print(f"{name:<40} {ratio:6.2f}x baseline {status}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Time the plot function hot paths without a display.")
+    parser.add_argument('-o', '--output', default='benchmark.json',
+        help="JSON file to write the results to")
+    parser.add_argument('-b', '--baseline',
+        help="JSON results to compare against")
+    parser.add_argument('-t', '--tolerance', type=float, default=0.25,
+        help="fraction slower than the baseline that counts as a "
+             "regression (default: 0.25)")
+    parser.add_argument('-k', '--filter',
+        help="only run benchmarks whose name contains this string")
+    parser.add_argument('-q', '--quick', action='store_true',
+        help="use smaller problem sizes")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(get_benchmarks(args.quick), args.filter)
+
+    regressions = []
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        report['meta']['baseline'] = args.baseline
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}",
+              file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
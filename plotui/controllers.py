@@ -1,11 +1,44 @@
-from model.grapher import ModelGrapher
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from model.registry import get_registry
+from model.session import Session, SessionPlot
+from tracing import tracer, traced
+
+# How often to check whether a background calculation has finished (ms)
+POLL_INTERVAL = 50
 
 
 class Controller(object):
     def __init__(self, view):
-        self.grapher = ModelGrapher()
+        self._grapher = None
         self.view = view
 
+        # Plot data is calculated in the background so the window stays
+        # responsive. A single worker means no plot model is ever used by
+        # two calculations at once.
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending = {}
+        # Plots of a loaded session still to be calculated, which are only
+        # started once nothing else is being calculated
+        self._queued = []
+
+        self._batch_depth = 0
+        self._redraw_requested = False
+        # Plots updated within a batch whose results are still to be set
+        self._batch_keys = set()
+
+    @property
+    def grapher(self):
+        # The grapher imports matplotlib and NumPy, so it is only loaded
+        # once it is first needed, after the window is shown
+        if self._grapher is None:
+            with tracer.stage('Controller.load_grapher'):
+                from model.grapher import ModelGrapher
+                from model.store import get_result_store
+                self._grapher = ModelGrapher(store=get_result_store())
+        return self._grapher
+
     ####################################################################
     #                        Artist properties                         #
     ####################################################################
@@ -15,31 +48,68 @@ class Controller(object):
 
     def set_title(self, title):
         self.grapher.set_axes_title(title)
-        self.view.redraw_canvas()
+        self.redraw_canvas()
 
     def set_xlabel(self, label):
         self.grapher.set_xlabel(label)
-        self.view.redraw_canvas()
+        self.redraw_canvas()
 
     def set_ylabel(self, label):
         self.grapher.set_ylabel(label)
-        self.view.redraw_canvas()
+        self.redraw_canvas()
+
+    def redraw_canvas(self):
+        # Within a batch the canvas is only redrawn once it has finished
+        if self._batch_depth > 0:
+            self._redraw_requested = True
+        else:
+            self.view.redraw_canvas()
+
+    @contextmanager
+    def batch(self):
+        """
+        A context in which canvas redraws are deferred until the end, for
+        operations that change many plots or properties at once. Plots
+        updated within it are calculated in the background, so the redraw
+        waits until the last of their results has been set.
+        """
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            self._end_batch()
+
+    def _end_batch(self):
+        if (self._batch_depth == 0 and not self._batch_keys
+                and self._redraw_requested):
+            self._redraw_requested = False
+            self.view.redraw_canvas()
+
+    def _settle_batch(self, key):
+        # A plot of a batch has been set, or won't be
+        if key in self._batch_keys:
+            self._batch_keys.discard(key)
+            self._end_batch()
 
     ####################################################################
     #                       Input data retrieval                       #
     ####################################################################
 
+    # The plot function metadata is read from the registry, which doesn't
+    # need the grapher to be loaded
+
     def get_functions(self):
-        return self.grapher.get_functions()
+        return get_registry().get_names()
 
     def get_user_options(self, plot_type):
-        return self.grapher.get_user_options(plot_type)
+        return get_registry().get(plot_type).user_option_args
 
     def get_xvars(self, plot_type):
-        return self.grapher.get_xvar_strings(plot_type)
+        return get_registry().get(plot_type).xvar_strings
 
     def get_yvars(self, plot_type):
-        return self.grapher.get_yvar_strings(plot_type)
+        return get_registry().get(plot_type).yvar_strings
 
     ####################################################################
     #                        Editing constants                         #
@@ -49,7 +119,7 @@ class Controller(object):
         self.view.init_set_constants_window(key, plot_type)
 
     def get_constant_strings(self, plot_type):
-        return self.grapher.get_constant_strings(plot_type)
+        return get_registry().get(plot_type).constant_strings
 
     def get_constant_vals(self, key):
         return self.grapher.get_constant_vals(key)
@@ -64,33 +134,120 @@ class Controller(object):
     def add_plot(self, key, plot_type):
         self.grapher.add_plot(key, plot_type)
 
+    @traced('Controller.update_plot')
     def update_plot(self, key):
         plot_args = self.view.get_plot_args(key)
-        self.grapher.update_plot(key, plot_args)
-        self.view.redraw_canvas()
+        if plot_args is None:
+            return
 
+        # A new request supersedes any calculation pending for the plot.
+        # The constants are taken here, as they can be changed whilst the
+        # worker runs.
+        self._cancel_pending(key)
+        self._unqueue(key)
+        request = self.grapher.get_plot_request(key, plot_args)
+        future = self._executor.submit(self.grapher.calc_plot_data, key,
+                                       request)
+        self._pending[key] = future
+        if self._batch_depth > 0:
+            self._batch_keys.add(key)
+        self.view.set_plot_busy(key, True)
+        self.view.after(POLL_INTERVAL, self._check_plot, key, future)
+
+    def update_plots(self, keys):
+        with self.batch():
+            for key in keys:
+                self.update_plot(key)
+
+    @traced('Controller.delete_plot')
     def delete_plot(self, key):
+        self._cancel_pending(key)
+        self._unqueue(key)
         self.grapher.delete_plot(key)
-        self.view.redraw_canvas()
+        self.redraw_canvas()
+        self._update_next_queued()
+
+    def _check_plot(self, key, future):
+        """
+        Applies the result of a background calculation on the Tk thread
+        once it has finished.
+        """
+        # Drop the results of superseded and cancelled calculations
+        if self._pending.get(key) is not future:
+            return
+        if not future.done():
+            self.view.after(POLL_INTERVAL, self._check_plot, key, future)
+            return
+
+        del self._pending[key]
+        self.view.set_plot_busy(key, False)
+        self._update_next_queued()
+        try:
+            xdata, ydata = future.result()
+        except Exception as e:
+            self._settle_batch(key)
+            self.message("Error", f"Unable to calculate plot: {e}")
+            return
+
+        with tracer.stage('Controller.set_plot_data', points=len(ydata)):
+            self.grapher.set_plot_data(key, xdata, ydata)
+        if key in self._batch_keys:
+            self._redraw_requested = True
+            self._settle_batch(key)
+        else:
+            self.redraw_canvas()
+
+    def close(self):
+        """
+        Stops the background calculations, once the window is closing.
+        """
+        self._cancel_all()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _cancel_all(self):
+        self._queued.clear()
+        for key in list(self._pending):
+            self._cancel_pending(key)
+
+    def _cancel_pending(self, key):
+        # Calculations that have already started can't be cancelled, so
+        # their results are dropped by _check_plot instead
+        future = self._pending.pop(key, None)
+        if future is not None:
+            future.cancel()
+        self._settle_batch(key)
+
+    def _unqueue(self, key):
+        if key in self._queued:
+            self._queued.remove(key)
+
+    def _update_next_queued(self):
+        # The queued plots are calculated one at a time, so that any plot
+        # the user redraws is calculated next
+        while self._queued and not self._pending:
+            self.update_plot(self._queued.pop(0))
 
     ####################################################################
     #                        Axes limit methods                        #
     ####################################################################
 
+    @traced('Controller.scale_axis')
     def scale_axis(self, xmin, xmax, ymin, ymax):
         self.grapher.set_axes_limits(xmin, xmax, ymin, ymax)
-        self.view.redraw_canvas()
+        self.redraw_canvas()
 
+    @traced('Controller.autoscale_axis')
     def autoscale_axis(self):
         self.grapher.set_axes_limits()
-        self.view.redraw_canvas()
+        self.redraw_canvas()
         return self.grapher.get_limits()
 
     ####################################################################
     #                            Exporting                             #
     ####################################################################
 
-    def export(self, selected_index, file_name):
+    @traced('Controller.export')
+    def export(self, selected_index, file_name, mode_index=0):
         # If export type is png image
         if selected_index == 0:
             file_name += '.png'
@@ -100,10 +257,137 @@ class Controller(object):
         # If export type is LaTeX data
         if selected_index == 1:
             file_name += '.dat'
-            self.grapher.export_dat(file_name)
+            # Data is either exported with shared x data or sequentially
+            self.grapher.export_dat(file_name, share_x=(mode_index == 0))
             self.message("Success", "Exported data.")
 
 
+    ####################################################################
+    #                             Sessions                             #
+    ####################################################################
+
+    @traced('Controller.save_session')
+    def save_session(self, file_name):
+        file_name += '.json'
+        plots = []
+        for key in self.view.get_plot_keys():
+            plot_args = self.view.get_plot_args(key)
+            if plot_args is None:
+                return
+            plots.append(SessionPlot(self.view.get_plot_type(key), plot_args,
+                                     self.grapher.get_constant_vals(key)))
+        session = Session(plots, *self.grapher.get_labels(),
+                          self.grapher.get_view_limits())
+        try:
+            session.save(file_name)
+        except (OSError, TypeError, ValueError) as e:
+            self.message("Error", f"Unable to save session: {e}")
+            return
+        self.message("Success", "Saved session.")
+
+    @traced('Controller.load_session')
+    def load_session(self, file_name):
+        """
+        Replaces the plots, labels and limits with those of a session
+        file. The panels are rebuilt at once, plots whose data is cached
+        are drawn straight away and the rest are calculated in the
+        background, those within the limits first.
+        """
+        file_name += '.json'
+        try:
+            session = Session.load(file_name)
+        except (OSError, TypeError, ValueError, KeyError) as e:
+            self.message("Error", f"Unable to load session: {e}")
+            return
+        unknown = [plot.plot_type for plot in session.plots
+                   if plot.plot_type not in get_registry()]
+        if unknown:
+            self.message("Error", f"Unable to load session, unknown plot "
+                         f"types: {', '.join(unknown)}")
+            return
+
+        with self.batch():
+            # Otherwise deleting each plot would start the next queued plot
+            # of the previous session, only for it to be deleted
+            self._cancel_all()
+            for key in self.view.get_plot_keys():
+                self.delete_plot(key)
+            self.view.clear_plots()
+
+            self.grapher.set_axes_title(session.title)
+            self.grapher.set_xlabel(session.xlabel)
+            self.grapher.set_ylabel(session.ylabel)
+            self.view.set_labels(session.title, session.xlabel,
+                                 session.ylabel)
+            if session.limits is None:
+                self.grapher.set_autoscale()
+            else:
+                self.grapher.set_axes_limits(*session.limits)
+                self.view.set_limits(session.limits)
+
+            keys = []
+            for plot in session.plots:
+                key = self.view.add_plot(plot.plot_type, plot.plot_args)
+                if plot.constants is not None:
+                    self.grapher.set_constant_vals(key, plot.constants)
+                keys.append(key)
+
+            for index in session.get_load_order():
+                key = keys[index]
+                data = self.grapher.get_cached_plot_data(key,
+                    self.view.get_plot_args(key))
+                if data is None:
+                    self._queued.append(key)
+                else:
+                    self.grapher.set_plot_data(key, *data)
+            self.redraw_canvas()
+
+        self._update_next_queued()
+
+    ####################################################################
+    #                           Diagnostics                            #
+    ####################################################################
+
+    def set_tracing(self, enabled):
+        tracer.set_enabled(enabled)
+
+    def clear_trace(self):
+        tracer.clear()
+        self.view.show_diagnostics(tracer.get_summary())
+
+    def export_trace(self, file_name):
+        file_name += '.json'
+        tracer.export_chrome_trace(file_name)
+        self.message("Success", "Exported trace.")
+
+    def set_model_tracing(self, enabled):
+        self.grapher.set_model_tracing(enabled)
+
+    def show_trace(self, key):
+        trace = self.grapher.get_trace(key)
+        if trace is None:
+            self.message("Error", "Tracing is not recording, enable it in "
+                         "the diagnostics panel and redraw the plot.")
+            return
+        self.view.show_trace(key, [(name, table.get_rows(), table.recorded)
+                                   for name, table in trace.get_tables()])
+
+    def export_model_trace(self, key, file_name):
+        trace = self.grapher.get_trace(key)
+        if trace is None:
+            return
+        file_name += '.dat'
+        try:
+            trace.export(file_name)
+        except OSError as e:
+            self.message("Error", f"Unable to export trace: {e}")
+            return
+        self.message("Success", "Exported trace.")
+
+    def canvas_drawn(self):
+        if tracer.enabled:
+            self.view.show_diagnostics(tracer.get_summary())
+
     ####################################################################
     #                         Error reporting                          #
     ####################################################################
@@ -1,8 +1,13 @@
+import time
+
+# Taken before the other imports, so they are included in the startup time
+START_TIME = time.perf_counter()
+
 from views.view import View
 
 
 def main():
-    view = View()
+    view = View(START_TIME)
 
 
 if __name__ == "__main__":
@@ -1,14 +1,12 @@
+import os
+from collections import OrderedDict, namedtuple
+
 import numpy as np
-import matplotlib
 from matplotlib.figure import Figure
-from matplotlib.backends.backend_agg import FigureCanvasAgg
-matplotlib.use('TkAgg')
-
 
-from common import PlotType
-from model.plotfunctions.general import StraightLinePlotFunction
-from model.plotfunctions.model1 import Model1PlotFunction
-from model.plotfunctions.model2 import Model2PlotFunction
+from tracing import tracer, traced
+from model.registry import get_registry
+from model.store import get_code_version
 
 
 class AxesLimits(object):
@@ -37,37 +35,220 @@ class AxesLimits(object):
 
     def update_limits_from_list(self, xdata=None, ydata=None):
         """
-        Updates the limits by calculating the max/min of a given range.
+        Updates the limits by calculating the max/min of the finite values
+        of a given range, so nan and inf values such as the inf psi of
+        Model 2 are ignored. The limits are nan if none are finite.
         """
         if xdata is not None and len(xdata) != 0:
-            self.xmin = min(xdata)
-            self.xmax = max(xdata)
+            self.xmin, self.xmax = finite_range(xdata)
         if ydata is not None and len(ydata) != 0:
-            self.ymin = min(ydata)
-            self.ymax = max(ydata)
+            self.ymin, self.ymax = finite_range(ydata)
+
+
+# Lines with more points than this per pixel of the axes width are drawn
+# decimated
+LOD_POINTS_PER_PIXEL = 4
+
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+# Everything a calculation of plot data needs, taken together on the
+# thread that owns the plot so that it can't change whilst it runs
+PlotRequest = namedtuple('PlotRequest',
+                         ['plot_args', 'constants', 'tracing', 'key'])
+
+
+class PlotDataCache(object):
+    """
+    A bounded least recently used cache of calculated plot data. Each
+    entry holds the x data and the y data of every y variable, so that
+    changing only the y variable doesn't require any recalculation.
+
+    If a ResultStore is given, entries are also saved to it and those
+    which aren't in memory are loaded from it, so they outlive the
+    process.
+    """
+    def __init__(self, maxsize=32, store=None):
+        self.maxsize = maxsize
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Returns the entry for the key, or None if it isn't cached.
+        """
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        entry = None if self.store is None else self.store.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._add(key, entry)
+        return entry
+
+    def put(self, key, entry):
+        self._add(key, entry)
+        if self.store is not None:
+            self.store.put(key, entry)
+
+    def _add(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize,
+                         len(self._entries))
 
 
 class PlotData(object):
     """
     Holds the axis data and line plot for each plotted line.
     """
-    def __init__(self, plot_model):
+    def __init__(self, plot_model, cache=None):
         self.plot_model = plot_model
+        self.cache = cache
+        # The constants the plot is next calculated with. The model is only
+        # changed by calculations, which may be running in the background.
+        self.constants = list(plot_model.get_constant_vals())
+        # Whether the model records a trace, applied in the same way
+        self.tracing = False
         self.xdata = None
         self.ydata = None
         self.line = None
         self.limits = AxesLimits()
+        # The decimated data last drawn and the view it was decimated for
+        self._line_data = None
+        self._line_key = None
 
     def update_plot_data(self, plot_args):
         """
-        Calculates data using methods on the plot_model
+        Calculates data using methods on the plot_model and stores it.
         """
-        self.plot_model.restore_defaults()
-        self.xdata = self.plot_model.get_xdata(plot_args.xvar, plot_args.xmin,
-                                              plot_args.xmax)
-        self.ydata = self.plot_model.get_ydata(plot_args.yvar, plot_args.ymin,
-                                              plot_args.ymax, self.xdata)
+        self.set_plot_data(*self.calc_plot_data(self.get_request(plot_args)))
+
+    def get_constant_vals(self):
+        return list(self.constants)
+
+    def set_constant_vals(self, vals):
+        self.constants = list(vals)
+
+    def get_request(self, plot_args):
+        """
+        Returns the request to calculate the plot with its current
+        constants, to be passed to calc_plot_data.
+        """
+        return PlotRequest(plot_args, list(self.constants), self.tracing,
+                           self._cache_key(plot_args))
+
+    def get_cached_plot_data(self, plot_args):
+        """
+        Returns the x and y data if they have already been calculated for
+        the same constants and arguments, or None.
+        """
+        if self.cache is None:
+            return None
+        entry = self.cache.get(self._cache_key(plot_args))
+        if entry is None:
+            return None
+        xdata, ydata = entry
+        return xdata, ydata[plot_args.yvar]
+
+    def calc_plot_data(self, request):
+        """
+        Returns the x and y data of a request from get_request calculated
+        using methods on the plot_model, unless it has already been
+        calculated for the same constants and arguments. Nothing is
+        stored, so this can be run away from the thread that owns the
+        line.
+        """
+        with tracer.stage('PlotData.calc_plot_data') as args:
+            if self.cache is None:
+                xdata, ydata = self._calc_plot_data(request)
+            else:
+                entry = self.cache.get(request.key)
+                args['cache'] = 'hit' if entry is not None else 'miss'
+                if entry is None:
+                    entry = self._calc_plot_data(request)
+                    self.cache.put(request.key, entry)
+                xdata, ydata = entry
+            args['points'] = len(xdata)
+
+        return xdata, ydata[request.plot_args.yvar]
+
+    def set_plot_data(self, xdata, ydata):
+        self.xdata = xdata
+        self.ydata = ydata
         self.limits.update_limits_from_list(self.xdata, self.ydata)
+        self._line_data = None
+        self._line_key = None
+
+    def get_line_data(self, xmin, xmax, pixels):
+        """
+        Returns the data to draw the line with when viewed between xmin
+        and xmax at a width of pixels. Long lines sorted by x are
+        decimated to a few points per pixel, whilst xdata and ydata keep
+        the full data for exporting.
+        """
+        n = min(len(self.xdata), len(self.ydata))
+        if n <= LOD_POINTS_PER_PIXEL * pixels or xmax <= xmin:
+            return self.xdata, self.ydata
+
+        key = (xmin, xmax, pixels)
+        if self._line_key != key:
+            xdata = np.asarray(self.xdata[:n], dtype=float)
+            ydata = np.asarray(self.ydata[:n], dtype=float)
+            if not np.all(xdata[1:] >= xdata[:-1]):
+                return self.xdata, self.ydata
+            with tracer.stage('PlotData.decimate') as args:
+                indices = decimate_indices(xdata, ydata, xmin, xmax, pixels)
+                args['points'] = n
+                args['drawn'] = len(indices)
+            self._line_data = (xdata[indices], ydata[indices])
+            self._line_key = key
+        return self._line_data
+
+    def _cache_key(self, plot_args):
+        # Everything the data depends on, as entries may be loaded from a
+        # store written by an earlier version of the plot function
+        return (self.plot_model.plot_type,
+                get_code_version(self.plot_model),
+                tuple(self.constants),
+                self.plot_model.get_settings_key(),
+                plot_args.xvar, plot_args.xmin, plot_args.xmax,
+                plot_args.ymin, plot_args.ymax)
+
+    def _calc_plot_data(self, request):
+        """
+        Returns the x data and a dictionary of the y data of every y
+        variable, all calculated from the same model run.
+        """
+        plot_args = request.plot_args
+        self.plot_model.set_constant_vals(request.constants)
+        self.plot_model.restore_defaults()
+        self.plot_model.set_tracing(request.tracing)
+        xdata = self.plot_model.get_xdata(plot_args.xvar, plot_args.xmin,
+                                          plot_args.xmax)
+        ydata = {}
+        for yvar in self.plot_model.yvar_strings:
+            ydata[yvar] = self.plot_model.get_ydata(yvar, plot_args.ymin,
+                                                    plot_args.ymax, xdata)
+        return xdata, ydata
 
 
 class ModelGrapher(object):
@@ -76,39 +257,34 @@ class ModelGrapher(object):
     structures, i.e. Model classes. Pyplot has not been used to make it
     simpler to customise the output for different backends.
     """
-    def __init__(self):
-        self._load_plot_functions()
-        self._load_artists()
-
-        self._type_to_model = {
-            PlotType.STRAIGHT_LINE: StraightLinePlotFunction,
-            PlotType.MODEL_1: Model1PlotFunction,
-            PlotType.MODEL_2: Model2PlotFunction,
-        }
+    def __init__(self, registry=None, store=None):
+        self._load_plot_functions(registry)
+        self._load_artists(store)
 
         # Set default titles and descriptions
         self._axes.set(title='Title', xlabel='x axis', ylabel='y axis')
 
-    def _load_plot_functions(self):
-        self._plot_functions = {}
-
-        straight_line = StraightLinePlotFunction()
-        model1 = Model1PlotFunction()
-        model2 = Model2PlotFunction()
-
-        self._plot_functions[straight_line.plot_type] = straight_line
-        self._plot_functions[model1.plot_type] = model1
-        self._plot_functions[model2.plot_type] = model2
+    def _load_plot_functions(self, registry):
+        # Only the metadata of the plot functions is loaded, their modules
+        # are imported when a plot of their type is first added
+        if registry is None:
+            registry = get_registry()
+        self._registry = registry
 
-        self._plot_function_strings = []
-        for key, val in self._plot_functions.items():
-            self._plot_function_strings.append(val.plot_type_string)
-
-    def _load_artists(self):
+    def _load_artists(self, store):
         self._fig = Figure()
         self._axes = self._fig.add_subplot(111)
         self._plot_data = {}
+        # Calculated data is also kept in the store, if given, to be
+        # loaded by later sessions and other processes
+        self._store = store
+        self._plot_data_cache = PlotDataCache(store=store)
         self._axes_limits = AxesLimits()
+        self._model_tracing = False
+
+        # Lines are decimated again whenever the view or its size changes
+        self._axes.callbacks.connect('xlim_changed', self._update_line_detail)
+        self._fig.canvas.mpl_connect('resize_event', self._update_line_detail)
 
     ####################################################################
     #                        Artist properties                         #
@@ -126,21 +302,25 @@ class ModelGrapher(object):
     def set_ylabel(self, label):
         self._axes.set_ylabel(label)
 
+    def get_labels(self):
+        return (self._axes.get_title(), self._axes.get_xlabel(),
+                self._axes.get_ylabel())
+
     ####################################################################
     #                       Input data retrieval                       #
     ####################################################################
 
     def get_functions(self):
-        return self._plot_function_strings
+        return self._registry.get_names()
 
     def get_user_options(self, plot_type):
-        return self._plot_functions[plot_type].user_option_args
+        return self._registry.get(plot_type).user_option_args
 
     def get_xvar_strings(self, plot_type):
-        return self._plot_functions[plot_type].xvar_strings
+        return self._registry.get(plot_type).xvar_strings
 
     def get_yvar_strings(self, plot_type):
-        return self._plot_functions[plot_type].yvar_strings
+        return self._registry.get(plot_type).yvar_strings
 
 
     ####################################################################
@@ -148,86 +328,173 @@ class ModelGrapher(object):
     ####################################################################
 
     def get_constant_strings(self, plot_type):
-        return self._plot_functions[plot_type].constant_strings
+        return self._registry.get(plot_type).constant_strings
 
     def get_constant_vals(self, key):
-        return self._plot_data[key].plot_model.get_constant_vals()
+        return self._plot_data[key].get_constant_vals()
 
     def set_constant_vals(self, key, vals):
-        return self._plot_data[key].plot_model.set_constant_vals(vals)
+        self._plot_data[key].set_constant_vals(vals)
 
     ####################################################################
     #                             Plotting                             #
     ####################################################################
 
     def add_plot(self, key, plot_type):
-        self._plot_data[key] = PlotData(self._type_to_model[plot_type]())
+        # Each plot keeps the same line, which is updated with new data
+        self._plot_data[key] = PlotData(self._registry.get(plot_type).create(),
+                                        self._plot_data_cache)
+        (self._plot_data[key].line,) = self._axes.plot([], [])
+        self._plot_data[key].tracing = self._model_tracing
+        self._plot_data[key].plot_model.set_resolution(self._get_axes_pixels())
 
     def update_plot(self, key, plot_args):
-        # Update the plot data, remove the current line and then redraw
+        # Update the plot data and then update the line in place
         if plot_args is not None:
-            self._remove_line(key)
             self._plot_data[key].update_plot_data(plot_args)
 
             self._calc_all_axes_limits()
-            self._plot_line(key)
+            self._update_line(key)
+
+    def get_plot_request(self, key, plot_args):
+        """
+        Returns the request to calculate a plot with calc_plot_data, which
+        must be taken on the thread that changes its constants.
+        """
+        return self._plot_data[key].get_request(plot_args)
+
+    def calc_plot_data(self, key, request):
+        """
+        Calculates and returns the data of a plot request without changing
+        the plot, so that it can be run in a background thread.
+        """
+        return self._plot_data[key].calc_plot_data(request)
+
+    def get_cached_plot_data(self, key, plot_args):
+        """
+        Returns the data of a plot as calc_plot_data if it is cached, or
+        None, without calculating it.
+        """
+        return self._plot_data[key].get_cached_plot_data(plot_args)
+
+    def set_plot_data(self, key, xdata, ydata):
+        """
+        Updates a plot with data returned by calc_plot_data.
+        """
+        self._plot_data[key].set_plot_data(xdata, ydata)
+
+        self._calc_all_axes_limits()
+        self._update_line(key)
+
+    def _get_axes_pixels(self):
+        # The width of the axes in pixels, which adaptively sampled plot
+        # functions place points to
+        width = self._fig.get_figwidth() * self._fig.dpi
+        return max(int(width * self._axes.get_position().width), 1)
+
+    def has_plot(self, key):
+        return key in self._plot_data
 
     def delete_plot(self, key):
-        # Return and remove the line from the list and unplot it
-        self._remove_line(key)
-        del self._plot_data[key]
+        # Remove the plot data and unplot its line
+        self._plot_data.pop(key).line.remove()
 
         self._calc_all_axes_limits()
 
-    def _remove_line(self, key):
-        if self._plot_data[key].line is not None:
-            (line,) = self._plot_data[key].line
-            if line in self._axes.lines:
-                line.remove()
+    def _update_line(self, key):
+        """
+        Sets the data of a line on the canvas from a PlotData class.
+        """
+        plot_data = self._plot_data[key]
+
+        with tracer.stage('ModelGrapher._update_line') as args:
+            # If there is no data (due to input error), empty the line
+            if len(plot_data.xdata) == 0 or len(plot_data.ydata) == 0:
+                plot_data.line.set_data([], [])
+            else:
+                self._set_line_data(plot_data)
+            args['points'] = len(plot_data.ydata)
+
+            # Lines only autoscale the view by themselves when first plotted
+            self._axes.relim()
+            self._axes.autoscale_view()
+
+    def _set_line_data(self, plot_data):
+        # Decimated lines keep the extremes of the whole line, so the view
+        # can still be autoscaled from them
+        xmin, xmax = sorted(self._axes.get_xlim())
+        plot_data.line.set_data(*plot_data.get_line_data(xmin, xmax,
+            self._get_axes_pixels()))
+
+    def _update_line_detail(self, *args):
+        """
+        Sets the data of every line for the current view, once its limits
+        or the size of the figure have changed.
+        """
+        for plot_data in self._plot_data.values():
+            if plot_data.xdata is None or plot_data.ydata is None:
+                continue
+            if len(plot_data.xdata) != 0 and len(plot_data.ydata) != 0:
+                self._set_line_data(plot_data)
 
-    def _plot_line(self, key):
+    def set_model_tracing(self, enabled):
         """
-        Plots a line to the canvas from a PlotData class.
+        Turns the trace recorders of the plot models on or off from their
+        next calculation. The cache is cleared, and the store isn't read
+        whilst tracing, so the next update of each plot runs its model.
         """
-        # If the data is None (due to input error), remove current line
-        if (len(self._plot_data[key].xdata) == 0
-                or len(self._plot_data[key].ydata) == 0):
-            return
+        self._model_tracing = enabled
+        for plot_data in self._plot_data.values():
+            plot_data.tracing = enabled
+        self._plot_data_cache.clear()
+        self._plot_data_cache.store = None if enabled else self._store
+
+    def get_trace(self, key):
+        plot_data = self._plot_data[key]
+        if not plot_data.tracing:
+            return None
+        return plot_data.plot_model.get_trace()
 
-        self._plot_data[key].line = self._axes.plot(
-            self._plot_data[key].xdata,
-            self._plot_data[key].ydata,
-            )
+    def get_cache_info(self):
+        return self._plot_data_cache.info()
 
     ####################################################################
     #                        Axes limit methods                        #
     ####################################################################
 
+    @traced('ModelGrapher._calc_all_axes_limits')
     def _calc_all_axes_limits(self):
-        x = []
-        y = []
-        for key, val in self._plot_data.items():
-            if np.isfinite(val.limits.xmin):
-                x.append(val.limits.xmin)
-            if np.isfinite(val.limits.xmax):
-                x.append(val.limits.xmax)
-            if np.isfinite(val.limits.ymin):
-                y.append(val.limits.ymin)
-            if np.isfinite(val.limits.ymax):
-                y.append(val.limits.ymax)
-        if len(x) == 0:
-            x.append(0)
-        if len(y) == 0:
-            y.append(0)
-        self._axes_limits.xmin = min(x)
-        self._axes_limits.xmax = max(x)
-        self._axes_limits.ymin = min(y)
-        self._axes_limits.ymax = max(y)
+        # Combines the limits of each plot, which are kept up to date as
+        # its data is set, so the data itself isn't scanned again
+        limits = np.array([(val.limits.xmin, val.limits.xmax, val.limits.ymin,
+                            val.limits.ymax)
+                           for val in self._plot_data.values()],
+                          dtype=float).reshape(-1, 4)
+        xmin, xmax = finite_range(limits[:, :2], 0)
+        ymin, ymax = finite_range(limits[:, 2:], 0)
+        self._axes_limits.xmin = xmin
+        self._axes_limits.xmax = xmax
+        self._axes_limits.ymin = ymin
+        self._axes_limits.ymax = ymax
 
     def get_limits(self):
         return (self._axes_limits.xmin, self._axes_limits.xmax,
                 self._axes_limits.ymin, self._axes_limits.ymax)
 
+    def get_view_limits(self):
+        """
+        Returns the limits of the view, or None if it is autoscaled to the
+        lines as they are plotted.
+        """
+        if self._axes.get_autoscalex_on() and self._axes.get_autoscaley_on():
+            return None
+        return self._axes.get_xlim() + self._axes.get_ylim()
+
+    def set_autoscale(self):
+        # The view follows the lines again, until the limits are next set
+        self._axes.set_autoscale_on(True)
+        self._axes.autoscale_view()
+
     def set_axes_limits(self, xmin=None, xmax=None, ymin=None, ymax=None):
         if xmin is None:
             xmin = self._axes_limits.xmin
@@ -251,16 +518,140 @@ class ModelGrapher(object):
     #                            Exporting                             #
     ####################################################################
 
-    def export_dat(self, file_name):
-        f = open(file_name, "w+")
-        pd_list = []
-        pd_list.append(list(self._plot_data.values())[0].xdata)
+    @traced('ModelGrapher.export_png')
+    def export_png(self, file_name):
+        # Render with Agg, which doesn't need a display. It is only needed
+        # for exporting, so is imported on first use.
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        FigureCanvasAgg(self._fig).print_png(file_name)
 
+    def export_dat(self, file_name, share_x=True):
+        """
+        Exports the plot data for use with pgfplots and returns the names
+        of the files written. If share_x is True, every plot is written to
+        the same file with a merged x column first, and plots without data
+        at an x value are nan. Otherwise each plot is written to its own
+        file, with the file name appended with 1, 2, 3, etc.
+        """
+        series = []
         for key, val in self._plot_data.items():
-            pd_list.append(val.ydata)
+            if val.xdata is None or val.ydata is None:
+                continue
+            n = min(len(val.xdata), len(val.ydata))
+            series.append((np.asarray(val.xdata[:n], dtype=float),
+                           np.asarray(val.ydata[:n], dtype=float)))
+
+        with tracer.stage('ModelGrapher.export_dat') as args:
+            args['points'] = sum(len(ydata) for xdata, ydata in series)
+
+            if share_x:
+                write_dat(file_name, merge_x_data(series))
+                return [file_name]
+
+            file_names = []
+            root, ext = os.path.splitext(file_name)
+            for count, (xdata, ydata) in enumerate(series, 1):
+                file_names.append(f'{root}{count}{ext}')
+                write_dat(file_names[-1], [xdata, ydata])
+            return file_names
+
+
+def finite_range(data, default=np.nan):
+    """
+    Returns the min and max of the finite values of data, or default for
+    both if there are none.
+    """
+    data = np.asarray(data, dtype=float)
+    finite = data[np.isfinite(data)]
+    if len(finite) == 0:
+        return default, default
+    return finite.min(), finite.max()
+
+
+def decimate_indices(xdata, ydata, xmin, xmax, columns):
+    """
+    Returns the indices of the points of a line sorted by x which draw
+    the same as the whole line when viewed between xmin and xmax at a
+    width of columns pixels. The first, last, lowest and highest points
+    of each column are kept, along with the first non-finite point so
+    gaps still show. The points either side of the view are each treated
+    as a single column, which keeps the extremes of the whole line.
+    """
+    n = len(xdata)
+    start = np.searchsorted(xdata, xmin, 'left')
+    end = np.searchsorted(xdata, xmax, 'right')
+
+    columns = int(columns)
+    bins = np.empty(n, dtype=np.intp)
+    bins[:start] = 0
+    bins[start:end] = 1 + np.minimum(((xdata[start:end] - xmin) * (columns
+        / (xmax - xmin))).astype(np.intp), columns - 1)
+    bins[end:] = columns + 1
+
+    # The points of each column are consecutive, as xdata is sorted
+    firsts = np.flatnonzero(np.diff(bins, prepend=-1))
+    lasts = np.append(firsts[1:], n) - 1
+    counts = lasts - firsts + 1
+
+    finite = np.isfinite(ydata)
+    y_low = np.where(finite, ydata, np.inf)
+    y_high = np.where(finite, ydata, -np.inf)
+    lows = np.repeat(np.minimum.reduceat(y_low, firsts), counts)
+    highs = np.repeat(np.maximum.reduceat(y_high, firsts), counts)
+
+    indices = [firsts, lasts]
+    for mask in (y_low == lows, y_high == highs, ~finite):
+        matches = np.flatnonzero(mask)
+        # Only the first match in each column is kept
+        first = np.diff(bins[matches], prepend=-1) != 0
+        indices.append(matches[first])
+    return np.unique(np.concatenate(indices))
+
+
+def merge_x_data(series):
+    """
+    Aligns a list of (xdata, ydata) series on the sorted union of their x
+    data. Returns the merged x column followed by a y column for each
+    series, which is nan where the series has no data.
+
+    An x value a series repeats, such as at the vertical steps of the
+    models, is given as many rows as the series repeating it most, and
+    each series fills them in its own order, so no point is lost.
+    """
+    if len(series) == 0:
+        return []
+
+    x = np.unique(np.concatenate([np.asarray(xdata) for xdata, ydata
+                                  in series]))
+    indices = [np.searchsorted(x, xdata) for xdata, ydata in series]
+    repeats = np.max([np.bincount(index, minlength=len(x))
+                      for index in indices], axis=0)
+    starts = np.cumsum(repeats) - repeats
+
+    columns = [np.repeat(x, repeats)]
+    for (xdata, ydata), index in zip(series, indices):
+        order = np.argsort(index, kind='stable')
+        index = index[order]
+        # The position of each point amongst those with the same x
+        rank = np.arange(len(index)) - np.searchsorted(index, index)
+        column = np.full(len(columns[0]), np.nan)
+        column[starts[index] + rank] = np.asarray(ydata)[order]
+        columns.append(column)
+    return columns
+
+
+def write_dat(file_name, columns, chunk_rows=65536):
+    """
+    Writes equal length columns of numbers to a space separated file.
+    Rows are formatted a chunk at a time from a single array, rather than
+    a value at a time.
+    """
+    with open(file_name, 'w') as f:
+        if len(columns) == 0:
+            return
 
-        for y in zip(*pd_list):
-            for i in y:
-                f.write(f'{i} ')
-            f.write('\n')
-        f.close()
+        data = np.column_stack(columns)
+        row_format = ' '.join(['%.17g'] * data.shape[1]) + '\n'
+        for start in range(0, len(data), chunk_rows):
+            chunk = data[start:start + chunk_rows]
+            f.write((row_format * len(chunk)) % tuple(chunk.ravel().tolist()))
@@ -0,0 +1,73 @@
+import os
+import warnings
+
+# The environment variable which sets the backend when the kernels are
+# first used, see set_backend
+BACKEND_VAR = 'PLOTUI_BACKEND'
+BACKENDS = ('auto', 'numba', 'python')
+
+_backend = None
+_kernels = None
+
+
+def set_backend(backend='auto'):
+    """
+    Sets how the cycles of Model2 are calculated. 'numba' uses the
+    kernels of model.plotfunctions.kernels compiled by numba, 'python'
+    uses the Python code of the model and 'auto' uses numba if it is
+    installed. Raises ImportError if 'numba' is set without numba.
+    """
+    global _backend, _kernels
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of "
+                         f"{', '.join(BACKENDS)}")
+
+    _kernels = None
+    if backend != 'python':
+        try:
+            from model.plotfunctions import kernels
+            _kernels = kernels
+        except ImportError:
+            if backend == 'numba':
+                raise
+    _backend = 'python' if _kernels is None else 'numba'
+
+
+def get_backend():
+    """
+    Returns the backend in use, 'numba' or 'python'. Until set_backend is
+    called it is set from the environment variable PLOTUI_BACKEND.
+    """
+    if _backend is None:
+        backend = os.environ.get(BACKEND_VAR, 'auto')
+        if backend not in BACKENDS:
+            warnings.warn(f"Ignoring unknown {BACKEND_VAR} '{backend}'")
+            backend = 'auto'
+        try:
+            set_backend(backend)
+        except ImportError as e:
+            warnings.warn(f"Unable to use the numba backend: {e}")
+            set_backend('python')
+    return _backend
+
+
+def get_kernel(name):
+    """
+    Returns the compiled kernel name, or None if the Python code is used.
+    """
+    if _backend is None:
+        get_backend()
+    if _kernels is None:
+        return None
+    return getattr(_kernels, name)
+
+
+def get_key():
+    """
+    The backend, to be added to the key of a simulation. np.log and the
+    log numba compiles to can differ in the last bit, so results are only
+    reused from the same backend.
+    """
+    if get_backend() == 'python':
+        return ()
+    return (_backend,)
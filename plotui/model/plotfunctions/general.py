@@ -1,6 +1,7 @@
 import numpy as np
 
 from common import PlotType, DisplayUserOptions
+from model.plotfunctions.manifests import STRAIGHT_LINE
 
 
 class BasePlotFunction(object):
@@ -24,14 +25,48 @@ class BasePlotFunction(object):
         self._x_var_to_func
         self._y_var_to_func
 
+    def _load_manifest(self, manifest):
+        """
+        Sets the metadata of the plot function from its manifest, see
+        manifests.py, which the registry also reads.
+        """
+        self.plot_type_string = manifest['name']
+        self.user_option_args = DisplayUserOptions(
+            **manifest.get('user_options', {}))
+        self.xvar_strings = list(manifest['xvars'])
+        self.yvar_strings = list(manifest['yvars'])
+        self.constant_strings = list(manifest.get('constants', []))
+
     def get_constant_vals(self):
+        # Plot functions without a model have no constants
+        if self.model is None:
+            return []
         return self.model.get_constant_vals()
 
     def set_constant_vals(self, vals):
-        return self.model.set_constant_vals(vals)
+        if self.model is not None:
+            self.model.set_constant_vals(vals)
 
     def restore_defaults(self):
-        self.model.restore_defaults()
+        if self.model is not None:
+            self.model.restore_defaults()
+
+    def set_tracing(self, enabled):
+        # Only plot functions with a trace recorder override this
+        pass
+
+    def set_resolution(self, pixels):
+        # The width of the plot in pixels, for plot functions which sample
+        # adaptively
+        pass
+
+    def get_trace(self):
+        return None
+
+    def get_settings_key(self):
+        # The settings other than the constants which change the data, for
+        # caching it
+        return ()
 
     def get_xdata(self, var, var_min=None, var_max=None, var_data=None):
         return self._x_var_to_func[var](var_min, var_max, var_data)
@@ -46,11 +81,7 @@ class StraightLinePlotFunction(BasePlotFunction):
     """
     def _init_grapher_data(self):
         self.plot_type = PlotType.STRAIGHT_LINE
-        self.plot_type_string = PlotType.to_string(self.plot_type)
-        self.user_option_args = DisplayUserOptions(show_xrange=True,
-            show_yrange=True)
-        self.xvar_strings = ['x']
-        self.yvar_strings =  ['y']
+        self._load_manifest(STRAIGHT_LINE)
         self._x_var_to_func = {
             'x': self._var_is_x,
             }
@@ -0,0 +1,134 @@
+import numpy as np
+from numba import njit
+
+# The kernels are compiled on first use and cached to disk next to this
+# file, or in the directory given by NUMBA_CACHE_DIR, so later runs only
+# load them. Each follows the Python code of Model2 operation for
+# operation, see backend.py for when they are used.
+
+
+@njit(cache=True)
+def return_HT(N, h0):
+    return np.log(N) + (h0 * (N - 1))
+
+
+@njit(cache=True)
+def to_int(value):
+    # As int(), which raises on the values numba would give nonsense for
+    if value != value:
+        raise ValueError("cannot convert float NaN to integer")
+    if abs(value) >= 2.0 ** 63:
+        raise OverflowError("cannot convert float to a 64 bit integer")
+    return float(int(value))
+
+
+@njit(cache=True)
+def solve_nq(nq0, nq, Q, h0, tgmax, fixed, count, tolerance):
+    """
+    CycleSolver.solve_nq starting from nq. Returns nq, HT(nq) and the
+    iterations run, wasted and whether it converged.
+    """
+    ht = return_HT(nq, h0)
+    wasted = 0
+    iterations = 0
+    converged = False
+    while iterations < count:
+        iterations += 1
+        last = nq
+        nq = nq0 + (ht * Q / 60)
+        ht = return_HT(nq, h0)
+        if nq > last and ht > tgmax:
+            converged = True
+            break
+        converged = abs(nq - last) <= tolerance * abs(nq)
+        if converged:
+            if not fixed:
+                break
+            wasted += 1
+            if nq == last:
+                break
+        elif nq != nq:
+            break
+    return nq, ht, iterations, wasted, converged
+
+
+@njit(cache=True)
+def solve_npmax(npmax, tg, h0, count, tolerance, fixed):
+    """
+    CycleSolver.solve_npmax starting from npmax. Returns npmax and the
+    iterations run, wasted and whether it converged.
+    """
+    wasted = 0
+    iterations = 0
+    converged = False
+    while iterations < count:
+        iterations += 1
+        last = npmax
+        npmax = npmax - ((np.log(npmax) + (h0 * (npmax - 1)) - tg)
+                         / (1 / npmax + h0))
+        converged = abs(npmax - last) <= tolerance * abs(npmax)
+        if converged:
+            if not fixed:
+                break
+            wasted += 1
+            if npmax == last:
+                break
+        elif npmax != npmax:
+            break
+    return npmax, iterations, wasted, converged
+
+
+@njit(cache=True)
+def calc_side_cycle(nq, nag, npmax, na_total, np_total, tgz, Q, trij, h0,
+        tgmax, fixed, nq_count, npmax_count, npmax_start, tolerance):
+    """
+    BridgeSide.calc_cycle_events from the state of the side at the end of
+    the previous cycle. Returns the new state, see
+    BridgeSide._calc_compiled_cycle_events, followed by the iterations
+    run, wasted and whether each of nq and npmax converged.
+    """
+    nq0 = nq
+    tr = (2 * trij) + tgz
+    nar = to_int((tr * Q) / 60)
+    nq += nar
+
+    # The previous nag warm starts nq when converging
+    start = nq if fixed else nq + nag
+    nq_end, ht, nq_iterations, nq_wasted, nq_converged = solve_nq(
+        nq, start, Q, h0, tgmax, fixed, nq_count, tolerance)
+    if ht > tgmax:
+        tg = tgmax
+        nag = to_int((tg * Q) / 60)
+    else:
+        tg = ht
+        nag = to_int(nq_end - nq)
+    na = nar + nag
+    nq += nag
+
+    if fixed or not npmax > 0:
+        npmax = npmax_start
+    npmax, npmax_iterations, npmax_wasted, npmax_converged = solve_npmax(
+        npmax, tg, h0, npmax_count, tolerance, fixed)
+    npmax = to_int(npmax)
+    np_ = nq if npmax > nq else npmax
+    nq -= np_
+
+    return (nq0, tr, nar, tg, nag, na, npmax, np_, nq, na_total + na,
+            np_total + np_, nq_iterations, nq_wasted, nq_converged,
+            npmax_iterations, npmax_wasted, npmax_converged)
+
+
+@njit(cache=True)
+def find_departure(N, np_totals, tcs, count, index, t, psi_c):
+    """
+    Model2.calc_waiting_time moving on from cycle index of the first count
+    cycles of a CycleHistory until car N can depart. Returns the index of
+    the cycle, t and psi_c at its end and whether it was reached.
+    """
+    while index + 1 < count:
+        index += 1
+        t += tcs[index]
+        if N <= np_totals[index]:
+            return index, t, psi_c, True
+        psi_c += tcs[index]
+    return index, t, psi_c, False
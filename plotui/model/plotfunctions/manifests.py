@@ -0,0 +1,42 @@
+from common import PlotType
+
+# The metadata of the built in plot functions, in the same form as the
+# .json manifests of the models directory, see README.md. It's read by
+# the registry before the plot functions are imported and by the plot
+# functions themselves, so this module must only hold data.
+
+STRAIGHT_LINE = {
+    'name': PlotType.to_string(PlotType.STRAIGHT_LINE),
+    'target': 'model.plotfunctions.general:StraightLinePlotFunction',
+    'xvars': ['x'],
+    'yvars': ['y'],
+    'user_options': {'show_xrange': True, 'show_yrange': True},
+    }
+
+MODEL_1 = {
+    'name': PlotType.to_string(PlotType.MODEL_1),
+    'target': 'model.plotfunctions.model1:Model1PlotFunction',
+    'xvars': ['tg'],
+    'yvars': ['tw'],
+    'constants': [
+        'Bridge length (m)', 'Car length (m)', 'Crossing velocity (km/h)',
+        'Arrival rate (per min)', 'Cycle',
+        ],
+    'user_options': {'show_xrange': True, 'show_set_constants': True},
+    }
+
+MODEL_2 = {
+    'name': PlotType.to_string(PlotType.MODEL_2),
+    'target': 'model.plotfunctions.model2:Model2PlotFunction',
+    'xvars': ['N', 't'],
+    'yvars': ['tw', 'psi_a', 'psi_c', 'psi_d', 'psi_ar', 'psi_ag'],
+    'constants': [
+        'Bridge length (m)', 'Car length (m)', 'Crossing velocity (km/h)',
+        'Qi (per min)', 'Qj (per min)', 'tgmax', 'N',
+        ],
+    'user_options': {'show_xrange': True, 'show_set_constants': True,
+                     'show_trace': True},
+    }
+
+# In the order they are registered
+BUILTINS = [STRAIGHT_LINE, MODEL_1, MODEL_2]
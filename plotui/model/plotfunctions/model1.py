@@ -1,7 +1,10 @@
 import numpy as np
 
-from common import PlotType, DisplayUserOptions
+from common import PlotType
 from model.plotfunctions.general import BasePlotFunction
+from model.plotfunctions.manifests import MODEL_1
+from model.plotfunctions.sampling import adaptive_sample, snap_breaks
+from model.plotfunctions.solvers import calc_green_time, solve_npmax
 
 
 class Conversions:
@@ -91,7 +94,7 @@ class BridgeSide(object):
         self.n0 = self.default_n0
 
     def calc_tg(self, n_p):
-        return np.log(n_p) + (self.p.h0 *(n_p - 1))
+        return calc_green_time(n_p, self.p.h0)
 
     def calc_tr(self, tg=None):
         if tg is None:
@@ -102,21 +105,11 @@ class BridgeSide(object):
         self.na = np.floor(((self.tr + tg) * self.Q) / 60)
 
     def calc_np(self, tg):
-        tg_out = 0.0
-        n_p = 0
-
-        while(True):
-            if tg < tg_out:
-                self.np = n_p - 1
-                return
-            n_p += 1
-            tg_out = self.calc_tg(n_p)
+        # tg can be a number or an array of values
+        self.np = solve_npmax(tg, self.p.h0)
 
     def calc_nq(self):
-        nq = (self.p.c * self.na) - (self.p.c * self.np)
-        if nq < 0:
-            nq = 0
-        self.nq = nq
+        self.nq = np.maximum((self.p.c * self.na) - (self.p.c * self.np), 0)
 
     def calc_r(self):
         self.r = np.floor(self.nq / self.np)
@@ -131,19 +124,7 @@ class Model1PlotFunction(BasePlotFunction):
     """
     def _init_grapher_data(self):
         self.plot_type = PlotType.MODEL_1
-        self.plot_type_string = PlotType.to_string(self.plot_type)
-        self.user_option_args = DisplayUserOptions(show_xrange=True,
-            show_set_constants=True)
-        self.xvar_strings = [
-            'tg',
-            ]
-        self.yvar_strings = [
-            'tw',
-            ]
-        self.constant_strings = [
-            'Bridge length (m)', 'Car length (m)', 'Crossing velocity (km/h)',
-            'Arrival rate (per min)', 'Cycle',
-            ]
+        self._load_manifest(MODEL_1)
         self._x_var_to_func = {
             'tg': self._x_is_tg,
             }
@@ -156,6 +137,17 @@ class Model1PlotFunction(BasePlotFunction):
         self.i = BridgeSide(self.p)
         self.j = BridgeSide(self.p)
 
+        # The number of pixels across the plot, and the largest error as a
+        # fraction of the range of tw, that tg is sampled for
+        self.pixels = 1000
+        self.tolerance = 1e-3
+
+    def set_resolution(self, pixels):
+        self.pixels = pixels
+
+    def get_settings_key(self):
+        return (self.pixels, self.tolerance)
+
     def get_constant_vals(self):
         constant_vals = [
             self.p.default_L, self.p.default_l,
@@ -186,7 +178,10 @@ class Model1PlotFunction(BasePlotFunction):
     ####################################################################
 
     def _x_is_tg(self, var_min, var_max, var_data):
-        self.i.tg = np.arange(var_min, var_max + 0.1, 0.1)
+        # tw is linear in tg between jumps, so tg is sampled densely only
+        # around the jumps, which are placed exactly
+        self.i.tg, self.i.tw = adaptive_sample(self.calc_tw, var_min, var_max,
+            self.pixels, self.tolerance, self.calc_breaks(var_min, var_max))
         return self.i.tg
 
 
@@ -195,16 +190,57 @@ class Model1PlotFunction(BasePlotFunction):
     ####################################################################
 
     def _y_is_tw(self, var_min, var_max, var_data):
-        tw = []
+        return self.calc_tw(self.i.tg)
+
+
+    ####################################################################
+    #                             Helpers                              #
+    ####################################################################
+
+    def calc_breaks(self, tg_min, tg_max):
+        """
+        Returns the values of tg between tg_min and tg_max where np or na
+        step, which are the only places tw can jump. Each is the smallest
+        tg at which calc_tw gives the new count.
+        """
+        self.p.calc_trij()
+        h0 = self.p.h0
+        # np steps to n once tg reaches the green time of n cars
+        n_p = np.arange(max(solve_npmax(tg_min, h0), 0) + 1,
+                        max(solve_npmax(tg_max, h0), 0) + 1)
+        np_breaks = snap_breaks(self._calc_np, calc_green_time(n_p, h0), n_p)
+        # na steps each time (tr + tg)*Q/60 reaches an integer, the range
+        # is widened as the formula rounds differently from calc_na. With
+        # no arrivals it never steps.
+        Q = self.i.Q
+        na_breaks = np.empty(0)
+        if Q > 0:
+            k_min = np.floor((2 * self.p.trij + 2 * tg_min) * Q / 60)
+            k_max = np.floor((2 * self.p.trij + 2 * tg_max) * Q / 60)
+            k = np.arange(k_min, k_max + 2)
+            na_breaks = snap_breaks(self._calc_na,
+                                    (k * 60 / Q - 2 * self.p.trij) / 2, k)
+        breaks = np.concatenate([np_breaks, na_breaks])
+        return breaks[np.isfinite(breaks)]
+
+    def _calc_na(self, tg):
+        self.i.calc_tr(tg)
+        self.i.calc_na(tg)
+        return self.i.na
+
+    def _calc_np(self, tg):
+        self.i.calc_np(tg)
+        return self.i.np
+
+    def calc_tw(self, tg):
+        # Every tg value is calculated at once on the whole array
         self.p.calc_trij()
 
-        for tg in self.i.tg.tolist():
-            self.i.calc_tr(tg)
-            self.i.calc_np(tg)
-            self.i.calc_na(tg)
-            self.i.calc_nq()
-            self.i.calc_r()
-            self.i.calc_tw(tg)
-            tw.append(self.i.tw)
+        self.i.calc_tr(tg)
+        self.i.calc_np(tg)
+        self.i.calc_na(tg)
+        self.i.calc_nq()
+        self.i.calc_r()
+        self.i.calc_tw(tg)
 
-        return np.asarray(tw)
+        return np.asarray(self.i.tw)
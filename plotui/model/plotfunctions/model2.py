@@ -1,9 +1,28 @@
+import copy
+import hashlib
+import os
+import tempfile
+from bisect import bisect_left
+from collections import OrderedDict, namedtuple
+from operator import attrgetter
+
 import numpy as np
 
-from common import PlotType, DisplayUserOptions
+from common import PlotType
+from model.plotfunctions.backend import get_kernel, get_key
 from model.plotfunctions.general import BasePlotFunction
+from model.plotfunctions.manifests import MODEL_2
+from model.store import _READ_ERRORS
+
+# The state of a bridge side at the end of a cycle
+SideState = namedtuple('SideState', [
+    'tr', 'tg', 'nar', 'nag', 'na', 'na_total', 'np', 'npmax', 'np_total',
+    'nq0', 'nq',
+    ])
 
-DEBUG = False
+# The state of both bridge sides at the end of a cycle, with the cycle
+# time and the elapsed time t as calculated whilst waiting for arrivals
+Cycle = namedtuple('Cycle', ['i', 'j', 'tc', 't'])
 
 
 class Conversions:
@@ -27,11 +46,180 @@ class Conversions:
         return value*18/5
 
 
+class SolverStats(object):
+    """
+    Counts the iterations of one of the equations solved by CycleSolver.
+    """
+    __slots__ = ('calls', 'iterations', 'skipped', 'wasted', 'unconverged')
+
+    def __init__(self):
+        self.clear()
+
+    def __repr__(self):
+        return (f"SolverStats(calls={self.calls}, "
+                f"iterations={self.iterations}, skipped={self.skipped}, "
+                f"wasted={self.wasted}, unconverged={self.unconverged})")
+
+    def clear(self):
+        # The number of times the equation was solved
+        self.calls = 0
+        # Iterations run
+        self.iterations = 0
+        # Iterations of the fixed count which weren't run, as the previous
+        # one left the value exactly unchanged
+        self.skipped = 0
+        # Iterations run which changed the value by no more than the
+        # tolerance
+        self.wasted = 0
+        # Solutions which changed by more than the tolerance on their last
+        # iteration
+        self.unconverged = 0
+
+
+class CycleSolver(object):
+    """
+    Solves the equations of each cycle which have no closed form: the
+    queue at the end of the green time, nq = nq0 + HT(nq)*Q/60, and the
+    maximum number of cars which can pass in the green time, HT(npmax) =
+    tg. The iterations used are counted in stats.
+
+    In the 'fixed' mode, the default, the results are bit for bit those
+    of the original fixed counts, 9 iterations of nq from nq0 and 2
+    Newton steps of npmax from 10. These are often not converged, so the
+    results depend on the counts. Iterations are only skipped once the
+    previous one left the value exactly unchanged, as they can't change
+    it either.
+
+    In the 'converged' mode each is warm started from the solution of
+    the previous cycle of the side and stopped once an iteration changes
+    it by no more than tolerance relative to its value, or after
+    max_iterations. This is the solution the fixed counts approximate,
+    so results differ from the 'fixed' mode wherever those weren't
+    converged, and the waiting times of a model are only comparable
+    between runs in the same mode. Where nq diverges, as it does once
+    h0*Q/60 exceeds 1, the green time is limited to tgmax as before.
+    """
+    MODES = ('fixed', 'converged')
+    FIXED_POINT_ITERATIONS = 9
+    NEWTON_ITERATIONS = 2
+    NEWTON_START = 10
+
+    def __init__(self, mode='fixed', tolerance=1e-9, max_iterations=100):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown solver mode '{mode}', expected one "
+                             f"of {', '.join(self.MODES)}")
+        self.mode = mode
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+        self.stats = {'nq': SolverStats(), 'npmax': SolverStats()}
+
+    @property
+    def key(self):
+        """
+        The settings which change the results, to be added to the key of
+        a simulation.
+        """
+        if self.mode == 'fixed':
+            return ()
+        return (self.mode, self.tolerance, self.max_iterations)
+
+    def clear_stats(self):
+        for stats in self.stats.values():
+            stats.clear()
+
+    def solve_nq(self, side, nq0):
+        """
+        Returns the queue of side at the end of its green time, given the
+        queue nq0 at its start, and the green time HT(nq).
+
+        nq0 + HT(nq)*Q/60 increases with nq, so once an iteration has
+        increased nq every later one does too. If HT(nq) is already over
+        tgmax the green time is limited to tgmax whatever nq ends up as,
+        so the iterations stop in either mode.
+        """
+        if self.mode == 'fixed':
+            nq = nq0
+            count = self.FIXED_POINT_ITERATIONS
+        else:
+            # The cars arriving in the previous green time
+            nq = nq0 + side.nag
+            count = self.max_iterations
+
+        tolerance = self.tolerance
+        tgmax = side.p.tgmax
+        ht = side.p.return_HT(nq)
+        wasted = 0
+        iterations = 0
+        converged = False
+        while iterations < count:
+            iterations += 1
+            last = nq
+            nq = nq0 + (ht * side.Q / 60)
+            ht = side.p.return_HT(nq)
+            if nq > last and ht > tgmax:
+                converged = True
+                break
+            converged = abs(nq - last) <= tolerance * abs(nq)
+            if converged:
+                # The iteration which shows convergence is needed
+                if self.mode != 'fixed':
+                    break
+                wasted += 1
+                if nq == last:
+                    break
+            elif nq != nq:
+                break
+
+        self._count('nq', iterations, count, wasted, converged)
+        return nq, ht
+
+    def solve_npmax(self, side):
+        """
+        Sets npmax of side to the solution of HT(npmax) = tg, which isn't
+        rounded.
+        """
+        if self.mode == 'fixed' or not side.npmax > 0:
+            side.npmax = self.NEWTON_START
+        count = (self.NEWTON_ITERATIONS if self.mode == 'fixed'
+                 else self.max_iterations)
+
+        tolerance = self.tolerance
+        wasted = 0
+        iterations = 0
+        converged = False
+        while iterations < count:
+            iterations += 1
+            last = side.npmax
+            side.npmax = side.npmax - (side.fnpmax() / side.fdnpmax())
+            converged = abs(side.npmax - last) <= tolerance * abs(side.npmax)
+            if converged:
+                # The iteration which shows convergence is needed
+                if self.mode != 'fixed':
+                    break
+                wasted += 1
+                if side.npmax == last:
+                    break
+            elif side.npmax != side.npmax:
+                break
+
+        self._count('npmax', iterations, count, wasted, converged)
+
+    def _count(self, name, iterations, count, wasted, converged):
+        stats = self.stats[name]
+        stats.calls += 1
+        stats.iterations += iterations
+        if self.mode == 'fixed':
+            stats.skipped += count - iterations
+        stats.wasted += wasted
+        stats.unconverged += not converged
+
+
 class GeneralProperties(object):
     """
     Properties shared by both sides of the bridge.
     """
     def __init__(self):
+        self.solver = CycleSolver()
         self.load_defaults()
         self.restore_defaults()
 
@@ -81,8 +269,21 @@ class GeneralProperties(object):
 
 class BridgeSide(object):
     """
-    A class detailing the properties of a single side of a bridge.
+    A class detailing the properties of a single side of a bridge. The
+    attributes are slots, as they are read and written many times per
+    cycle.
     """
+    # Every attribute which changes as the model runs, in the order of the
+    # tuples returned by get_state
+    STATE_VARS = (
+        'Q', 'nq0', 'tg', 'tr', 'tw', 'na', 'na_total', 'nar', 'nag', 'np',
+        'npmax', 'np_total', 'nq', 'Na', 'Np', 'psi_a', 'psi_c', 'psi_d',
+        'psi_ar', 'psi_ag',
+        )
+    __slots__ = ('p', 'default_Q', 'default_nq0') + STATE_VARS
+
+    _get_state = staticmethod(attrgetter(*STATE_VARS))
+
     def __init__(self, general_properties):
         self.p = general_properties
         self.load_defaults()
@@ -124,6 +325,11 @@ class BridgeSide(object):
     ####################################################################
 
     def calc_cycle_events(self, tgz):
+        kernel = get_kernel('calc_side_cycle')
+        if kernel is not None:
+            self._calc_compiled_cycle_events(kernel, tgz)
+            return
+
         # Order: nq0 tr nar (nq+nar) tg nag na (nq+nag) npM np (nq-np) naT npT
         # Initial queue = queue at the end of the previous cycle
         self.nq0 = self.nq
@@ -142,6 +348,29 @@ class BridgeSide(object):
         self.update_natotal()
         self.update_nptotal()
 
+    def _calc_compiled_cycle_events(self, kernel, tgz):
+        # The same events calculated by a compiled kernel, see backend.py
+        solver = self.p.solver
+        fixed = solver.mode == 'fixed'
+        if fixed:
+            nq_count = solver.FIXED_POINT_ITERATIONS
+            npmax_count = solver.NEWTON_ITERATIONS
+        else:
+            nq_count = npmax_count = solver.max_iterations
+
+        (self.nq0, self.tr, self.nar, self.tg, self.nag, self.na, self.npmax,
+            self.np, self.nq, self.na_total, self.np_total, nq_iterations,
+            nq_wasted, nq_converged, npmax_iterations, npmax_wasted,
+            npmax_converged) = kernel(
+                float(self.nq), float(self.nag), float(self.npmax),
+                float(self.na_total), float(self.np_total), float(tgz),
+                float(self.Q), float(self.p.trij), float(self.p.h0),
+                float(self.p.tgmax), fixed, nq_count, npmax_count,
+                float(solver.NEWTON_START), float(solver.tolerance))
+        solver._count('nq', nq_iterations, nq_count, nq_wasted, nq_converged)
+        solver._count('npmax', npmax_iterations, npmax_count, npmax_wasted,
+                      npmax_converged)
+
     def calc_tr(self, tgz):
         self.tr = (2 * self.p.trij) + tgz
 
@@ -150,11 +379,7 @@ class BridgeSide(object):
 
     def calc_tg_nag(self):
         nq0 = self.nq
-        nq = nq0
-        for x in range(1, 10):
-            nq = nq0 + (self.p.return_HT(nq) * self.Q / 60)
-
-        self.tg = self.p.return_HT(nq)
+        nq, self.tg = self.p.solver.solve_nq(self, nq0)
         if self.tg > self.p.tgmax:
             self.tg = self.p.tgmax
             self.calc_nag()
@@ -168,12 +393,7 @@ class BridgeSide(object):
         self.na = self.nar + self.nag
 
     def calc_npmax_np(self):
-        iteration_count = 3
-        # Set initial value of np
-        self.npmax = 10
-
-        for x in range(1,iteration_count):
-            self.npmax = self.npmax - (self.fnpmax()/self.fdnpmax())
+        self.p.solver.solve_npmax(self)
 
         self.npmax = int(self.npmax)
         self.np = self.nq if self.npmax > self.nq else self.npmax
@@ -195,12 +415,34 @@ class BridgeSide(object):
         self.np_total = 0.0
         self.nq0 = self.default_nq0
         self.nq = self.nq0
+        self.reset_waiting_times()
+
+    def reset_waiting_times(self):
         self.psi_a = 0.0
         self.psi_c = 0.0
         self.psi_d = 0.0
         self.psi_ar = 0.0
         self.psi_ag = 0.0
 
+    def get_cycle_state(self):
+        return SideState(self.tr, self.tg, self.nar, self.nag, self.na,
+            self.na_total, self.np, self.npmax, self.np_total, self.nq0,
+            self.nq)
+
+    def set_cycle_state(self, state):
+        (self.tr, self.tg, self.nar, self.nag, self.na, self.na_total,
+            self.np, self.npmax, self.np_total, self.nq0, self.nq) = state
+
+    def get_state(self):
+        """
+        Returns a tuple of every variable of the side, see STATE_VARS.
+        """
+        return self._get_state(self)
+
+    def set_state(self, state):
+        for name, val in zip(self.STATE_VARS, state):
+            setattr(self, name, val)
+
     ####################################################################
     #                    Waiting time calculations                     #
     ####################################################################
@@ -224,33 +466,6 @@ class BridgeSide(object):
     def calc_psi_ag(self):
         self.psi_ag = self.p.return_HT(self.Np)
 
-    ####################################################################
-    #                              Debug                               #
-    ####################################################################
-
-    def print_titles(self):
-        print()
-        print(' {:<8} | {:<8} | {:<8} | {:<8} | {:<8} | {:<8} |'
-              ' {:<8} | {:<8} | {:<8} | {:<8} | {:<8} | {:<8} |'
-              ' {:<8} | {:<8} | {:<8} | {:<8} | '.format(
-                'N', 'tr', 'tg', 'Na', 'nar', 'nag', 'na',
-                'na_total', 'Np', 'np', 'np_total', 'psi_a', 'psi_c', 'psi_d',
-                'psi_ar', 'psi_ag',
-                ))
-        print()
-
-    def print_vars(self, N):
-        print(' {:<8.2f} | {:<8.2f} | {:<8.2f} | {:<8.2f} | {:<8.2f} |'
-              ' {:<8.2f} | {:<8.2f} | {:<8.2f} | {:<8.2f} | {:<8.2f} |'
-              ' {:<8.2f} | {:<8.2f} | {:<8.2f} | {:<8.2f} | {:<8.2f} |'
-              ' {:<8.2f} | '.format(
-                N, self.tr, self.tg, self.Na, self.nar, self.nag, self.na,
-                self.na_total, self.Np, self.np, self.np_total, self.psi_a,
-                self.psi_c, self.psi_d, self.psi_ar, self.psi_ag,
-                )
-              )
-
-
 class Model2(object):
     """
     The model
@@ -259,6 +474,9 @@ class Model2(object):
         self.p = GeneralProperties()
         self.i = BridgeSide(self.p)
         self.j = BridgeSide(self.p)
+        self.trace = None
+        self.checkpoints = CycleCheckpoints()
+        self._sweep_record = None
 
     ####################################################################
     #                     Communication Functions                      #
@@ -306,34 +524,178 @@ class Model2(object):
         if N is None:
             N = self.p.N
 
+        # Cycles are resumed from the nearest checkpoint before car N
+        # arrives, rather than simulated from the start
+        self.run_sweep([N])
+
+    def run_sweep(self, N_l):
+        """
+        Gives the same results as simulating each N in N_l from the start,
+        but each cycle is only calculated once for the whole range.
+        """
+        history = None
+        seeds = {}
+        key = self.get_simulation_key()
+
+        # Reuse the results of the previous sweep where it covered the
+        # same values of N from the same dummy tgj
+        reused = self._resume_sweep(key, N_l, seeds)
+        start = len(self.tw_l)
+        queues_l = []
+        seeds_l = []
+        counts = []
+
+        for N in N_l[reused:]:
+            # The dummy tgj only depends on the queues left by the previous
+            # car, so it is reused whenever they are the same
+            queues = (self.i.nq, self.j.nq)
+            queues_l.append(queues)
+            counts.append(len(self.tw_l) - start)
+            if N >= 1 and queues in seeds:
+                self.j.tg = seeds[queues]
+            else:
+                self.calc_dummy_cycle()
+                seeds[queues] = self.j.tg
+
+            if N < 1:
+                seeds_l.append(None)
+                continue
+            seeds_l.append(self.j.tg)
+
+            # The cycles after the counters are reset only depend on the
+            # dummy tgj, so the history can be reused until it changes
+            if history is None or not history.is_valid(self.j.tg, N):
+                history = CycleHistory(self, key + (self.j.tg,), N)
+
+            # Jump straight to the cycle the car arrives in
+            history.restore_arrival(N)
+            self.i.reset_waiting_times()
+            if get_kernel('find_departure') is None:
+                self.calc_waiting_time(N, history.restore_next_cycle)
+            else:
+                self.calc_waiting_time(N, history.restore_next_cycle,
+                                       history.restore_departure)
+
+        self.checkpoints.flush()
+        if queues_l:
+            counts.append(len(self.tw_l) - start)
+            self._record_sweep(key, N_l, reused, queues_l, seeds_l, counts)
+
+    def _resume_sweep(self, key, N_l, seeds):
+        """
+        Appends the recorded results of the leading values of N_l, if the
+        previous sweep calculated them in the same way, and restores the
+        queues left after them. Returns how many were reused.
+        """
+        record = self._sweep_record
+        # The trace must cover the whole sweep
+        if record is None or record.key != key or self.trace is not None:
+            return 0
+        if len(N_l) == 0:
+            return 0
+
+        index = int(N_l[0] - record.N_l[0])
+        if not 0 <= index < len(record.N_l) or \
+                record.N_l[index] != N_l[0]:
+            return 0
+        if not self._same_start(record, index, seeds):
+            return 0
+
+        count = min(len(N_l), len(record.N_l) - index)
+        if not np.array_equal(N_l[:count], record.N_l[index:index + count]):
+            return 0
+
+        # No results are appended for N < 1
+        first, last = record.counts[index], record.counts[index + count]
+        for name, results in record.results.items():
+            getattr(self, name).extend(results[first:last])
+        if index + count < len(record.N_l):
+            self.i.nq, self.j.nq = record.queues_l[index + count]
+        else:
+            self.i.nq, self.j.nq = record.end_queues
+        return count
+
+    def _same_start(self, record, index, seeds):
+        """
+        Returns whether the recorded sweep from index onwards applies to
+        the current state of the model.
+        """
+        queues = (self.i.nq, self.j.nq)
+        if record.queues_l[index] == queues:
+            return True
+        # Once the counters are reset, car N and everything after it only
+        # depend on the dummy tgj, whatever queues it was found from
+        if record.seeds_l[index] is None:
+            return False
+        state = self.get_state()
+        self.calc_dummy_cycle()
+        seeds[queues] = self.j.tg
+        self.set_state(state)
+        return seeds[queues] == record.seeds_l[index]
+
+    def _record_sweep(self, key, N_l, reused, queues_l, seeds_l, counts):
+        record = self._sweep_record
+        # Keep the longest sweep, e.g. over a single N
+        if record is not None and record.key == key and not reused and \
+                len(N_l) < len(record.N_l):
+            return
+
+        if reused:
+            index = int(N_l[0] - record.N_l[0])
+            queues_l = record.queues_l[index:index + reused] + queues_l
+            seeds_l = record.seeds_l[index:index + reused] + seeds_l
+            first = record.counts[index]
+            offset = record.counts[index + reused] - first
+            counts = ([count - first for count
+                       in record.counts[index:index + reused]]
+                      + [count + offset for count in counts])
+
+        results = {name: getattr(self, name)[len(self.tw_l) - counts[-1]:]
+                   for name in self.RESULT_LISTS}
+        self._sweep_record = SweepRecord(key, np.array(N_l), queues_l,
+            seeds_l, counts, (self.i.nq, self.j.nq), results)
+
+    def get_simulation_key(self):
+        """
+        Returns the constants which the cycles of a simulation depend on,
+        other than the dummy tgj.
+        """
+        return (self.p.L, self.p.l, self.p.v, self.p.tgmax, self.i.Q,
+                self.j.Q, self.i.default_nq0, self.j.default_nq0) \
+            + self.p.solver.key + get_key()
+
+    def set_checkpoints(self, spacing=64, max_checkpoints=4096,
+            directory=None):
+        """
+        Replaces the checkpoint store, see CycleCheckpoints.
+        """
+        self.checkpoints = CycleCheckpoints(spacing, max_checkpoints,
+                                            directory)
+
+    def set_solver(self, mode='fixed', tolerance=1e-9, max_iterations=100):
+        """
+        Replaces the solver of the cycle equations, see CycleSolver.
+        """
+        self.p.solver = CycleSolver(mode, tolerance, max_iterations)
+
+    def get_solver_stats(self):
+        return self.p.solver.stats
+
+    def calc_dummy_cycle(self):
         # Initialise and calculate dummy data for tgj
         self.p.calc_trij()
         self.p.calc_h0()
         self.j.tg = 40
         self.calc_ij_cycle_events()
 
-        if DEBUG and ((N % 20) == 0 or N == 1):
-            self.i.print_titles()
-
-        if N < 1:
-            return
-
-        # Reset counters, caclulate initial state
-        self.i.reset_vars()
-        self.j.reset_vars()
-        self.p.reset_vars()
-        self.calc_ij_cycle_events()
-
-        # Recalclate the cycle events until the car arrives
-        while True:
-            # If the car hasn't arrived, calculate cycle events
-            if N > self.i.na_total:
-                self.calc_ij_cycle_events()
-                self.p.t += self.p.tc
-            # If the car has arrived, calc Na, go onto the next step
-            else:
-                self.i.calc_Na(N)
-                break
+    def calc_waiting_time(self, N, next_cycle, restore_departure=None):
+        """
+        Calculates the waiting time of car N from the end of the cycle it
+        arrives in. next_cycle is called to move onto each later cycle,
+        or if given, restore_departure is called once to move straight
+        onto the cycle it departs in, adding those before to psi_c.
+        """
+        self.i.calc_Na(N)
 
         # If the car can leave during the cycle it arrives
         if N <= self.i.np_total:
@@ -352,10 +714,15 @@ class Model2(object):
         else:
             # Calculate the arrival delay
             self.i.calc_psi_a()
+            if restore_departure is not None:
+                restore_departure()
+                self.i.calc_Np(N)
+                self.i.calc_psi_d()
+                self.i.tw = self.i.psi_a + self.i.psi_c + self.i.psi_d
             # Simulate cycles until the car is able to leave
-            while True:
+            while restore_departure is None:
                 # Recalculate all events to get to the next cycle
-                self.calc_ij_cycle_events()
+                next_cycle()
                 # If it can depart during this cycle
                 if N <= self.i.np_total:
                     self.i.calc_Np(N)
@@ -370,8 +737,39 @@ class Model2(object):
         self.p.t += self.i.tw
         self.append_vars()
 
-        if DEBUG:
-            self.i.print_vars(N)
+        trace = self.trace
+        if trace is not None:
+            trace.record(N, self)
+
+    def set_tracing(self, enabled, capacity=100000):
+        if not enabled:
+            self.trace = None
+        elif self.trace is None:
+            self.trace = CycleTrace(capacity)
+
+    def get_state(self):
+        """
+        Returns a snapshot of the variables of both sides and the elapsed
+        time, which can be restored with set_state.
+        """
+        return (self.p.t, self.p.tc, self.i.get_state(), self.j.get_state())
+
+    def set_state(self, state):
+        self.p.t, self.p.tc, i_state, j_state = state
+        self.i.set_state(i_state)
+        self.j.set_state(j_state)
+
+    def copy(self):
+        """
+        Returns an independent copy of the model in its current state.
+        """
+        model = copy.copy(self)
+        model.p = copy.copy(self.p)
+        model.i = copy.copy(self.i)
+        model.j = copy.copy(self.j)
+        model.i.p = model.p
+        model.j.p = model.p
+        return model
 
 
     ####################################################################
@@ -380,10 +778,12 @@ class Model2(object):
 
     def _x_is_N(self, var_min, var_max, var_data):
         self.reset_result_lists()
+        trace = self.trace
+        if trace is not None:
+            trace.clear()
 
         N_l = np.arange(var_min, var_max + 1, 1)
-        for N in N_l:
-            self.run_simulation(N)
+        self.run_sweep(N_l)
 
         return N_l
 
@@ -425,6 +825,10 @@ class Model2(object):
         self.p.tc = self.i.tg + self.i.tr
         self.p.t += self.p.tc
 
+    # The lists of results, in the order they are appended
+    RESULT_LISTS = ['tw_l', 't_l', 'psi_a_l', 'psi_c_l', 'psi_d_l',
+                    'psi_ar_l', 'psi_ag_l']
+
     def reset_result_lists(self):
         self.tw_l = []
         self.t_l = []
@@ -444,6 +848,404 @@ class Model2(object):
         self.psi_ag_l.append(np.inf if self.i.psi_ag == 0 else self.i.psi_ag)
 
 
+class TraceBuffer(object):
+    """
+    Rows of named numbers stored in a preallocated ring buffer, so once it
+    is full the oldest rows are overwritten.
+    """
+    def __init__(self, fields, capacity=100000):
+        self.fields = list(fields)
+        self._rows = np.zeros(capacity,
+                              dtype=[(field, float) for field in self.fields])
+        self._count = 0
+
+    def __len__(self):
+        return min(self._count, len(self._rows))
+
+    @property
+    def recorded(self):
+        # The number of rows recorded, including those overwritten
+        return self._count
+
+    def clear(self):
+        self._count = 0
+
+    def append(self, row):
+        self._rows[self._count % len(self._rows)] = row
+        self._count += 1
+
+    def get_rows(self):
+        """
+        Returns a copy of the rows as a record array, oldest first.
+        """
+        if self._count <= len(self._rows):
+            rows = self._rows[:self._count].copy()
+        else:
+            rows = np.roll(self._rows, -(self._count % len(self._rows)))
+        return rows.view(np.recarray)
+
+    def export(self, file_name):
+        """
+        Writes the rows to a space separated file with a header line.
+        """
+        rows = self.get_rows()
+        columns = np.column_stack([rows[field] for field in self.fields])
+        np.savetxt(file_name, columns, fmt='%.17g',
+                   header=' '.join(self.fields), comments='')
+
+
+class CycleTrace(object):
+    """
+    Records the state of both sides at the end of every simulated cycle,
+    and the state of side i at the end of the cycle in which the waiting
+    time of each car is found. Each is kept in its own TraceBuffer.
+    """
+    CYCLE_FIELDS = (
+        ['N', 'cycle', 't', 'tc']
+        + [f'i_{field}' for field in SideState._fields]
+        + [f'j_{field}' for field in SideState._fields]
+        )
+    CAR_FIELDS = [
+        'N', 't', 'tr', 'tg', 'Na', 'nar', 'nag', 'na', 'na_total', 'Np',
+        'np', 'npmax', 'np_total', 'nq', 'tw', 'psi_a', 'psi_c', 'psi_d',
+        'psi_ar', 'psi_ag',
+        ]
+
+    def __init__(self, capacity=100000):
+        self.cycles = TraceBuffer(self.CYCLE_FIELDS, capacity)
+        self.cars = TraceBuffer(self.CAR_FIELDS, capacity)
+
+    def clear(self):
+        self.cycles.clear()
+        self.cars.clear()
+
+    def record_cycle(self, N, index, cycle):
+        """
+        Records a Cycle, the index-th of a simulation, which was first
+        needed for the waiting time of car N.
+        """
+        self.cycles.append((N, index, cycle.t, cycle.tc) + cycle.i + cycle.j)
+
+    def record(self, N, model):
+        i = model.i
+        self.cars.append((
+            N, model.p.t, i.tr, i.tg, i.Na, i.nar, i.nag, i.na, i.na_total,
+            i.Np, i.np, i.npmax, i.np_total, i.nq, i.tw, i.psi_a, i.psi_c,
+            i.psi_d, i.psi_ar, i.psi_ag,
+            ))
+
+    def get_tables(self):
+        """
+        Returns the name and the TraceBuffer of each table.
+        """
+        return [('cycles', self.cycles), ('cars', self.cars)]
+
+    def export(self, file_name):
+        """
+        Writes each table to its own file, with the file name appended
+        with its name, and returns the names of the files written.
+        """
+        file_names = []
+        root, ext = os.path.splitext(file_name)
+        for name, table in self.get_tables():
+            file_names.append(f'{root}_{name}{ext}')
+            table.export(file_names[-1])
+        return file_names
+
+
+class CycleHistory(object):
+    """
+    Records the end of every cycle of a single simulation of a Model2,
+    calculating further cycles only when they are first requested. The
+    recorded cycles are restored onto the model to avoid recalculating
+    them for every value of N.
+    """
+    def __init__(self, model, key, N):
+        self._model = model
+        self._key = key
+        self._trace = model.trace
+        self._seed = model.j.tg
+        self._N = N
+
+        # Simulate on a copy, so the model is free to be restored onto
+        self._sim = model.copy()
+        self._sim.i.reset_vars()
+        self._sim.j.reset_vars()
+        self._sim.p.reset_vars()
+        self._sim.calc_ij_cycle_events()
+
+        # Start from the latest checkpoint before car N arrives, the
+        # earlier cycles are never needed, unless every cycle is traced
+        self._offset = 0
+        checkpoint = None
+        if self._trace is None:
+            checkpoint = model.checkpoints.find(key, N)
+        if checkpoint is not None:
+            self._offset, state = checkpoint
+            self._sim.set_state(state)
+        self._arrival = self._offset
+        self._index = self._offset
+
+        self._cycles = []
+        self._record_cycle()
+        # The departure check of the first _synced cycles, for the compiled
+        # kernel used by restore_departure
+        self._np_totals = np.empty(64)
+        self._tcs = np.empty(64)
+        self._synced = 0
+
+    def is_valid(self, tgj, N):
+        # The arrival cycle is only searched for forwards
+        return tgj == self._seed and N >= self._N
+
+    def restore_arrival(self, N):
+        """
+        Restores the model to the end of the cycle in which car N arrives.
+        """
+        self._N = N
+        while N > self._get_cycle(self._arrival).i.na_total:
+            self._arrival += 1
+
+        self._index = self._arrival
+        self._restore_cycle()
+        self._model.p.t = self._get_cycle(self._index).t
+
+    def restore_next_cycle(self):
+        """
+        Restores the model to the end of the following cycle, in the same
+        way as calling calc_ij_cycle_events.
+        """
+        self._index += 1
+        cycle = self._get_cycle(self._index)
+
+        # Only the departure check reads the cycles before car N departs,
+        # so the full state is restored once it is able to
+        if self._N <= cycle.i.np_total:
+            self._restore_cycle()
+        else:
+            self._model.i.np_total = cycle.i.np_total
+            self._model.p.tc = cycle.tc
+        self._model.p.t += self._model.p.tc
+
+    def restore_departure(self):
+        """
+        Restores the model to the end of the cycle in which car N can
+        depart, in the same way as calling restore_next_cycle until it
+        can, and adds the cycle times before it to psi_c of side i.
+        """
+        kernel = get_kernel('find_departure')
+        model = self._model
+        index = self._index - self._offset
+        t, psi_c = model.p.t, model.i.psi_c
+        while True:
+            self._sync_cycles()
+            index, t, psi_c, found = kernel(float(self._N), self._np_totals,
+                self._tcs, self._synced, index, t, psi_c)
+            if found:
+                break
+            self._get_cycle(self._offset + len(self._cycles))
+
+        self._index = self._offset + index
+        self._restore_cycle()
+        model.p.t = t
+        model.i.psi_c = psi_c
+
+    def _sync_cycles(self):
+        # Copies the departure check of the cycles recorded since the last
+        # call into the arrays read by the kernel
+        count = len(self._cycles)
+        if count > len(self._tcs):
+            size = max(count, 2 * len(self._tcs))
+            self._np_totals = np.resize(self._np_totals, size)
+            self._tcs = np.resize(self._tcs, size)
+        for index in range(self._synced, count):
+            cycle = self._cycles[index]
+            self._np_totals[index] = cycle.i.np_total
+            self._tcs[index] = cycle.tc
+        self._synced = count
+
+    def _restore_cycle(self):
+        cycle = self._get_cycle(self._index)
+        self._model.i.set_cycle_state(cycle.i)
+        self._model.j.set_cycle_state(cycle.j)
+        self._model.p.tc = cycle.tc
+
+    def _get_cycle(self, index):
+        index -= self._offset
+        while index >= len(self._cycles):
+            self._sim.calc_ij_cycle_events()
+            self._sim.p.t += self._sim.p.tc
+            self._record_cycle()
+        return self._cycles[index]
+
+    def _record_cycle(self):
+        self._cycles.append(Cycle(self._sim.i.get_cycle_state(),
+            self._sim.j.get_cycle_state(), self._sim.p.tc, self._sim.p.t))
+        index = self._offset + len(self._cycles) - 1
+        self._model.checkpoints.add(self._key, index, self._sim)
+        if self._trace is not None:
+            self._trace.record_cycle(self._N, index, self._cycles[-1])
+
+
+# The results of a sweep over N. queues_l holds the queues (i.nq, j.nq)
+# before each N and end_queues those after the last, seeds_l holds the
+# dummy tgj of each N (None for N < 1) and counts holds the number of
+# results before each N and after the last.
+SweepRecord = namedtuple('SweepRecord', ['key', 'N_l', 'queues_l', 'seeds_l',
+                                         'counts', 'end_queues', 'results'])
+
+
+class CycleCheckpoints(object):
+    """
+    Stores the full state of simulations every spacing cycles, so that
+    a later simulation with the same constants and dummy tgj can resume
+    from the latest cycle it doesn't need instead of from the start.
+
+    At most max_checkpoints are kept in memory, the checkpoints of the
+    least recently used simulations are dropped first. If a directory
+    is given the checkpoints are also saved there, one .npz file per
+    simulation, and loaded when a simulation is first used. Files are
+    replaced atomically, as several processes may share the directory.
+    """
+    def __init__(self, spacing=64, max_checkpoints=4096, directory=None):
+        self.spacing = spacing
+        self.max_checkpoints = max_checkpoints
+        self.directory = directory
+        self._count = 0
+        self._dirty = set()
+        # Simulation key -> (cycle indices, i.na_total, states)
+        self._checkpoints = OrderedDict()
+
+    def __len__(self):
+        return self._count
+
+    def clear(self):
+        self._checkpoints.clear()
+        self._dirty.clear()
+        self._count = 0
+
+    def find(self, key, N):
+        """
+        Returns (cycle index, state) of the latest checkpoint before car
+        N arrives, or None if there isn't one.
+        """
+        checkpoints = self._get(key)
+        if checkpoints is None:
+            return None
+        indices, na_totals, states = checkpoints
+        position = bisect_left(na_totals, N) - 1
+        if position < 0:
+            return None
+        return indices[position], states[position]
+
+    def add(self, key, index, model):
+        # Only every spacing cycles, and in order
+        if index == 0 or index % self.spacing != 0:
+            return
+        checkpoints = self._get(key)
+        if checkpoints is None:
+            checkpoints = ([], [], [])
+            self._checkpoints[key] = checkpoints
+        indices, na_totals, states = checkpoints
+        if indices and index <= indices[-1]:
+            return
+        if self._count >= self.max_checkpoints and not self._evict(key):
+            return
+
+        indices.append(index)
+        na_totals.append(model.i.na_total)
+        states.append(model.get_state())
+        self._count += 1
+        self._dirty.add(key)
+
+    def flush(self):
+        """
+        Saves the checkpoints added since the last flush to the directory.
+        """
+        if self.directory is not None:
+            for key in self._dirty:
+                if key in self._checkpoints:
+                    self._save(key, self._checkpoints[key])
+        self._dirty.clear()
+
+    def _get(self, key):
+        if key in self._checkpoints:
+            self._checkpoints.move_to_end(key)
+            return self._checkpoints[key]
+        if self.directory is None:
+            return None
+
+        checkpoints = self._load(key)
+        if checkpoints is not None:
+            self._count += len(checkpoints[0])
+            self._checkpoints[key] = checkpoints
+            while self._count > self.max_checkpoints and self._evict(key):
+                pass
+        return checkpoints
+
+    def _evict(self, key):
+        # Drops the least recently used simulation other than key, saving
+        # it first if it has checkpoints which aren't in the directory
+        for old_key in self._checkpoints:
+            if old_key != key:
+                checkpoints = self._checkpoints.pop(old_key)
+                if old_key in self._dirty and self.directory is not None:
+                    self._save(old_key, checkpoints)
+                self._dirty.discard(old_key)
+                self._count -= len(checkpoints[0])
+                return True
+        return False
+
+    def _file_name(self, key):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.directory, f'{digest}.npz')
+
+    def _save(self, key, checkpoints):
+        indices, na_totals, states = checkpoints
+        # The checkpoints are only an optimisation, so failures are ignored
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temp_name = tempfile.mkstemp('.tmp', dir=self.directory)
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, key=repr(key), index=indices,
+                    state=[(t, tc) + i + j for t, tc, i, j in states])
+            os.replace(temp_name, self._file_name(key))
+        except OSError:
+            self._remove(temp_name)
+
+    def _load(self, key):
+        file_name = self._file_name(key)
+        if not os.path.exists(file_name):
+            return None
+        try:
+            with np.load(file_name) as data:
+                # Guard against a hash collision
+                if str(data['key']) != repr(key):
+                    return None
+                indices = data['index'].tolist()
+                rows = data['state'].tolist()
+        except _READ_ERRORS:
+            # Left broken, it's replaced when the simulation is next saved
+            self._remove(file_name)
+            return None
+
+        size = len(BridgeSide.STATE_VARS)
+        states = [(row[0], row[1], tuple(row[2:2 + size]),
+                   tuple(row[2 + size:])) for row in rows]
+        na_totals = [state[2][BridgeSide.STATE_VARS.index('na_total')]
+                     for state in states]
+        return indices, na_totals, states
+
+    def _remove(self, file_name):
+        try:
+            os.remove(file_name)
+        except OSError:
+            pass
+
+
 class Model2PlotFunction(BasePlotFunction):
     """
     A class containing model state information.
@@ -453,25 +1255,7 @@ class Model2PlotFunction(BasePlotFunction):
 
     def _init_grapher_data(self):
         self.plot_type = PlotType.MODEL_2
-        self.plot_type_string = PlotType.to_string(self.plot_type)
-        self.user_option_args = DisplayUserOptions(show_xrange=True,
-            show_set_constants=True)
-        self.xvar_strings = [
-            'N',
-            't',
-            ]
-        self.yvar_strings = [
-            'tw',
-            'psi_a',
-            'psi_c',
-            'psi_d',
-            'psi_ar',
-            'psi_ag',
-            ]
-        self.constant_strings = [
-            'Bridge length (m)', 'Car length (m)', 'Crossing velocity (km/h)',
-            'Qi (per min)', 'Qj (per min)', 'tgmax', 'N'
-            ]
+        self._load_manifest(MODEL_2)
         self._x_var_to_func = {
             'N': self.model._x_is_N,
             't': self.model._x_is_t,
@@ -484,3 +1268,12 @@ class Model2PlotFunction(BasePlotFunction):
             'psi_ar': self.model._y_is_psi_ar,
             'psi_ag': self.model._y_is_psi_ag,
             }
+
+    def set_tracing(self, enabled):
+        self.model.set_tracing(enabled)
+
+    def get_trace(self):
+        return self.model.trace
+
+    def get_settings_key(self):
+        return self.model.p.solver.key + get_key()
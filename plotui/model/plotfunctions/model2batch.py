@@ -0,0 +1,392 @@
+from collections import namedtuple
+
+import numpy as np
+
+from model.plotfunctions.model2 import Conversions, CycleSolver
+
+# The variables of a bridge side after a cycle, for an array of runs.
+# valid is False for the runs where Model2 raises an error converting a
+# non-finite number of cars to an int.
+SideCycle = namedtuple('SideCycle', [
+    'tr', 'tg', 'nar', 'na', 'np', 'nq', 'valid',
+    ])
+
+
+class BatchModel2(object):
+    """
+    Simulates Model2 for many sets of constants in lockstep. The variables
+    of every run are held in arrays, so each step of the model is a few
+    numpy operations whatever the number of runs, and runs which have
+    already finished a step are masked out of it. The results of each run
+    are bit for bit those of Model2 with the 'fixed' solver.
+
+    As with CycleHistory, the cycles simulated for each run are kept, so
+    each car restores the cycle it arrives in rather than simulating from
+    the start. The cycles only depend on the dummy tgj they start from,
+    and the cycles of the last histories dummy tgj of each run are kept,
+    as some alternate between them from car to car. Runs for which Model2
+    raises an error, or which need more than max_cycles cycles, are
+    marked in failed and their results are nan.
+    """
+    # The variables of each kept cycle, of side i unless named otherwise
+    CYCLE_VARS = ('tr', 'nar', 'na', 'na_total', 'np', 'np_total', 'nq_i',
+                  'nq_j', 'tg_j', 'tc', 't')
+    # The results of each car, in the order of the last axis of the array
+    # returned by run_sweep
+    RESULT_VARS = ('t', 'tw', 'psi_a', 'psi_c', 'psi_d', 'psi_ar', 'psi_ag')
+
+    def __init__(self, constants, histories=2, max_cycles=100000):
+        # As in Model2.set_constant_vals and GeneralProperties
+        constants = np.asarray(constants, dtype=float).reshape(-1, 7)
+        L, l, v, Qi, Qj, tgmax, N = constants.T
+        v = Conversions.kmph_to_metres(v)
+        self.size = len(constants)
+        self.h0 = (l / v) + 2
+        self.trij = ((L + l) / v) * 4 / 3
+        self.Qi = Qi
+        self.Qj = Qj
+        self.tgmax = tgmax
+        self.histories = histories
+        self.max_cycles = max_cycles
+        self.failed = np.zeros(self.size, dtype=bool)
+
+    def run_sweep(self, N_min, N_max):
+        """
+        Simulates every car from N_min to N_max of every run, in the same
+        way as Model2._x_is_N. Returns an array of shape (run, N, result
+        variable), see RESULT_VARS, where only N of 1 or more have results.
+        """
+        self._reset()
+        N_l = np.arange(N_min, N_max + 1, 1)
+        results = np.full((self.size, np.count_nonzero(N_l >= 1),
+                           len(self.RESULT_VARS)), np.nan)
+
+        column = 0
+        with np.errstate(all='ignore'):
+            for N in N_l:
+                seeds = self._calc_seeds(N)
+                if N < 1:
+                    continue
+                rows = np.flatnonzero(~self.failed)
+                rows, values = self._calc_waiting_time(N, rows, seeds[rows])
+                results[rows, column] = values
+                column += 1
+
+        results[self.failed] = np.nan
+        return results
+
+    def _reset(self):
+        size = self.size
+        self.failed[:] = False
+        # The queues left by the previous car, which the dummy cycle of the
+        # next starts from, and those the last seeds were calculated from
+        self._queue_i = np.zeros(size)
+        self._queue_j = np.zeros(size)
+        self._seed_queue_i = np.full(size, np.nan)
+        self._seed_queue_j = np.full(size, np.nan)
+        self._seeds = np.full(size, np.nan)
+
+        # The kept cycles of each history, which are only valid for its
+        # seed. The histories of run k are k*histories onwards, and are
+        # replaced least recently used first.
+        slots = size * self.histories
+        self._cycles = np.empty((slots, 64, len(self.CYCLE_VARS)))
+        self._count = np.zeros(slots, dtype=np.intp)
+        self._history_seed = np.full(slots, np.nan)
+        self._arrival = np.zeros(slots, dtype=np.intp)
+        self._used = np.full(slots, -np.inf)
+        # The index of the first cycle of each history which is invalid,
+        # or max_cycles
+        self._invalid_from = np.full(slots, self.max_cycles, dtype=np.intp)
+
+    ####################################################################
+    #                              Cycles                              #
+    ####################################################################
+
+    def _calc_seeds(self, N):
+        """
+        Returns the dummy tgj of each run, as in Model2.calc_dummy_cycle.
+        The dummy cycle only depends on the queues, so it is only
+        calculated again for runs whose queues have changed.
+        """
+        if N < 1:
+            # Without a car the dummy cycle is kept as the state of the model
+            rows = np.flatnonzero(~self.failed)
+        else:
+            rows = np.flatnonzero(~self.failed & (
+                (self._queue_i != self._seed_queue_i)
+                | (self._queue_j != self._seed_queue_j)))
+        if len(rows) == 0:
+            return self._seeds
+
+        queue_i = self._queue_i[rows]
+        queue_j = self._queue_j[rows]
+        i = self._calc_side_cycle(rows, queue_i, 40, self.Qi)
+        j = self._calc_side_cycle(rows, queue_j, i.tg, self.Qj)
+        self.failed[rows[~(i.valid & j.valid)]] = True
+
+        self._seeds[rows] = j.tg
+        self._seed_queue_i[rows] = queue_i
+        self._seed_queue_j[rows] = queue_j
+        if N < 1:
+            self._queue_i[rows] = i.nq
+            self._queue_j[rows] = j.nq
+        return self._seeds
+
+    def _calc_side_cycle(self, rows, nq, tgz, Q):
+        """
+        Returns the variables of a side of rows after
+        BridgeSide.calc_cycle_events, starting with the queue nq.
+        """
+        Q = Q[rows]
+        h0 = self.h0[rows]
+        # tr, nar, update queue
+        tr = (2 * self.trij[rows]) + tgz
+        nar = (tr * Q) / 60
+        valid = np.isfinite(nar)
+        nar = _int(nar)
+        nq = nq + nar
+
+        # tg, nag, na, update queue, with the fixed counts of CycleSolver
+        nq0 = nq
+        for count in range(CycleSolver.FIXED_POINT_ITERATIONS):
+            nq = nq0 + (_return_HT(nq, h0) * Q / 60)
+        tg = _return_HT(nq, h0)
+        clipped = tg > self.tgmax[rows]
+        tg = np.where(clipped, self.tgmax[rows], tg)
+        nag = np.where(clipped, (tg * Q) / 60, nq - nq0)
+        valid &= np.isfinite(nag)
+        nag = _int(nag)
+        na = nar + nag
+        nq = nq0 + nag
+
+        # np, npmax, update queue
+        npmax = np.full(len(rows), float(CycleSolver.NEWTON_START))
+        for count in range(CycleSolver.NEWTON_ITERATIONS):
+            npmax = npmax - (((np.log(npmax) + (h0 * (npmax - 1))) - tg)
+                             / (1 / npmax + h0))
+        valid &= np.isfinite(npmax)
+        npmax = _int(npmax)
+        np_ = np.where(npmax > nq, nq, npmax)
+        nq = nq - np_
+        return SideCycle(tr, tg, nar, na, np_, nq, valid)
+
+    def _extend(self, slots, count):
+        """
+        Simulates cycles of the histories slots until each has count
+        cycles, stopping at any cycle for which Model2 raises an error.
+        """
+        while True:
+            kept = self._count[slots]
+            short = slots[(kept < count) & (kept <= self._invalid_from[slots])]
+            if len(short) == 0:
+                return
+            self._simulate_cycle(short)
+
+    def _simulate_cycle(self, slots):
+        """
+        Simulates and keeps the cycle after the last kept cycle of each of
+        the histories slots, in the same way as CycleHistory.
+        """
+        rows = slots // self.histories
+        count = self._count[slots]
+        if count.max() >= self._cycles.shape[1]:
+            self._cycles = np.concatenate([self._cycles,
+                                           np.empty_like(self._cycles)], 1)
+
+        # The first cycle follows the counters being reset
+        first = count == 0
+        (tr, nar, na, na_total, np_, np_total, nq_i, nq_j, tg_j, tc,
+            t) = self._cycles[slots, np.maximum(count - 1, 0)].T
+        nq_i = np.where(first, 0.0, nq_i)
+        nq_j = np.where(first, 0.0, nq_j)
+        tg_j = np.where(first, self._history_seed[slots], tg_j)
+        na_total = np.where(first, 0.0, na_total)
+        np_total = np.where(first, 0.0, np_total)
+        t = np.where(first, 0.0, t)
+
+        i = self._calc_side_cycle(rows, nq_i, tg_j, self.Qi)
+        j = self._calc_side_cycle(rows, nq_j, i.tg, self.Qj)
+        tc = i.tg + i.tr
+        # Cycles after the first are also added to t whilst waiting for
+        # the car to arrive
+        t = t + tc
+        t = np.where(first, t, t + tc)
+
+        self._cycles[slots, count] = np.column_stack([
+            i.tr, i.nar, i.na, na_total + i.na, i.np, np_total + i.np, i.nq,
+            j.nq, j.tg, tc, t])
+        self._count[slots] += 1
+        # Cycles are simulated ahead of those needed, so runs only fail if
+        # they reach an invalid one
+        invalid = ~(i.valid & j.valid)
+        self._invalid_from[slots[invalid]] = count[invalid]
+
+    def _find_cycles(self, N, slots, start, var):
+        """
+        Returns the index of the first cycle of each of the histories slots
+        from start at which var reaches N, simulating cycles as they are
+        needed. The index is -1 for those which would need to pass a cycle
+        for which Model2 raises an error, or max_cycles.
+        """
+        column = self.CYCLE_VARS.index(var)
+        found = np.full(len(slots), -1)
+        pending = np.arange(len(slots))
+        start = np.asarray(start)
+        width = 8
+        while len(pending) != 0:
+            pending_slots = slots[pending]
+            first = start[pending]
+            self._extend(pending_slots, first + width)
+
+            # Only the cycles before any invalid cycle can be reached
+            limit = np.minimum(self._count[pending_slots],
+                               self._invalid_from[pending_slots])
+            index = first[:, None] + np.arange(width)
+            values = self._cycles[pending_slots[:, None],
+                                  np.minimum(index, self._cycles.shape[1] - 1),
+                                  column]
+            reached = (N <= values) & (index < limit[:, None])
+
+            hit = reached.any(1)
+            found[pending[hit]] = first[hit] + reached[hit].argmax(1)
+            blocked = ~hit & (first + width > limit)
+            pending = pending[~hit & ~blocked]
+            start = start.copy()
+            start[pending] += width
+            width *= 2
+        return found
+
+    ####################################################################
+    #                    Waiting time calculations                     #
+    ####################################################################
+
+    def _calc_waiting_time(self, N, rows, seeds):
+        """
+        Returns the rows which haven't failed and their results of car N,
+        as in Model2.run_sweep followed by Model2.calc_waiting_time.
+        """
+        slots = self._get_history_slots(N, rows, seeds)
+
+        # The cycle car N arrives in
+        arrival = self._find_cycles(N, slots, self._arrival[slots],
+                                    'na_total')
+        slots, arrival = self._drop_failed(slots, arrival)
+        self._arrival[slots] = arrival
+        rows = slots // self.histories
+        h0 = self.h0[rows]
+
+        (tr, nar, na, na_total, np_, np_total, nq_i, nq_j, tg_j, tc,
+            t) = self._cycles[slots, arrival].T
+        results = np.zeros((len(rows), len(self.RESULT_VARS)))
+        (t_r, tw_r, psi_a_r, psi_c_r, psi_d_r, psi_ar_r,
+            psi_ag_r) = range(len(self.RESULT_VARS))
+        Na = N - na_total + na
+
+        # Cars which can leave during the cycle they arrive
+        leave = N <= np_total
+        Np = _calc_Np(N, np_total, np_, Na)
+        red = Na <= nar
+        psi_ar = np.where(red, (1 - (Na / nar)) * tr, 0.0)
+        psi_ag = _return_HT(Np, h0)
+        results[leave, psi_ar_r] = psi_ar[leave]
+        results[leave, psi_ag_r] = psi_ag[leave]
+        results[leave, tw_r] = np.where(red, psi_ar + psi_ag, psi_ag)[leave]
+
+        # Cars which can't, which wait for the cycles until they can
+        departure = arrival.copy()
+        wait = np.flatnonzero(~leave)
+        if len(wait) != 0:
+            departure[wait] = self._find_cycles(N, slots[wait],
+                                                arrival[wait] + 1, 'np_total')
+            self.failed[rows[departure == -1]] = True
+            wait = wait[departure[wait] != -1]
+
+        if len(wait) != 0:
+            psi_a = (1 - (Na[wait] / na[wait])) * tc[wait]
+            # The cycle times of the cycles after arrival up to departure,
+            # which are summed in order, as Model2 adds them a cycle at a
+            # time
+            span = departure[wait] - arrival[wait]
+            steps = np.arange(span.max())
+            index = arrival[wait][:, None] + 1 + steps
+            tc_wait = self._cycles[slots[wait][:, None],
+                                   np.minimum(index, departure[wait][:, None]),
+                                   self.CYCLE_VARS.index('tc')]
+            psi_c = np.cumsum(np.where(steps < span[:, None] - 1, tc_wait,
+                                       0.0), 1)[:, -1]
+            t[wait] = np.cumsum(np.column_stack([
+                t[wait], np.where(steps < span[:, None], tc_wait, 0.0)]),
+                1)[:, -1]
+
+            (tr_d, nar_d, na_d, na_total_d, np_d, np_total_d, nq_i_d, nq_j_d,
+                tg_j_d, tc_d, t_d) = self._cycles[slots[wait],
+                                                  departure[wait]].T
+            Np = _calc_Np(N, np_total_d, np_d, Na[wait])
+            psi_d = tr_d + _return_HT(Np, h0[wait])
+            results[wait, psi_a_r] = psi_a
+            results[wait, psi_c_r] = psi_c
+            results[wait, psi_d_r] = psi_d
+            results[wait, tw_r] = psi_a + psi_c + psi_d
+
+        # Rows which failed whilst waiting are dropped
+        valid = ~self.failed[rows]
+        rows, slots, departure, results, t = (rows[valid], slots[valid],
+            departure[valid], results[valid], t[valid])
+        results[:, t_r] = (t + results[:, tw_r]) / 60
+
+        # The queues left by the car, for the dummy cycle of the next
+        last = self._cycles[slots, departure]
+        self._queue_i[rows] = last[:, self.CYCLE_VARS.index('nq_i')]
+        self._queue_j[rows] = last[:, self.CYCLE_VARS.index('nq_j')]
+
+        # Waiting times which weren't calculated are inf, as in append_vars
+        psi = results[:, psi_a_r:]
+        psi[psi == 0] = np.inf
+        return rows, results
+
+    def _drop_failed(self, slots, index):
+        # Marks the runs of slots whose index is -1 as failed, and returns
+        # the others
+        failed = index == -1
+        self.failed[slots[failed] // self.histories] = True
+        return slots[~failed], index[~failed]
+
+    def _get_history_slots(self, N, rows, seeds):
+        """
+        Returns the history of each of rows which starts from its seed,
+        replacing the least recently used history of rows without one.
+        """
+        histories = self.histories
+        match = self._history_seed.reshape(-1, histories)[rows] \
+            == seeds[:, None]
+        found = match.any(1)
+        oldest = self._used.reshape(-1, histories)[rows].argmin(1)
+        slots = rows * histories + np.where(found, match.argmax(1), oldest)
+
+        new = slots[~found]
+        self._history_seed[new] = seeds[~found]
+        self._count[new] = 0
+        self._arrival[new] = 0
+        self._invalid_from[new] = self.max_cycles
+        self._used[slots] = N
+        return slots
+
+
+########################################################################
+#                               Helpers                                #
+########################################################################
+
+def _return_HT(N, h0):
+    return np.log(N) + (h0 * (N - 1))
+
+
+def _int(value):
+    # As int(), adding 0.0 turns the -0.0 of values between -1 and 0 into
+    # the 0 of an int
+    return np.trunc(value) + 0.0
+
+
+def _calc_Np(N, np_total, np_, Na):
+    Np = N - np_total + np_
+    return np.where(Np < 1, Na, Np)
@@ -0,0 +1,181 @@
+import numpy as np
+
+
+def adaptive_sample(func, x_min, x_max, pixels=1000, tolerance=1e-3,
+        breaks=None):
+    """
+    Samples func, which takes and returns arrays, over x_min to x_max
+    with points placed where they are needed. Returns the x and y arrays.
+
+    The range is first sampled once per pixel, for pixels across it, and
+    either side of any breaks, which are x values where func is known to
+    possibly jump, see snap_breaks. Intervals whose midpoint is further
+    than tolerance, as a fraction of the range of y, from a straight line
+    between their ends are bisected, so jumps are placed to the precision
+    of x. Below the width of a pixel an interval without a break is only
+    followed while a single half of it fails, which bounds the number of
+    points by the pixels and breaks rather than the number of unknown
+    jumps. Finally points on straight segments are removed.
+    """
+    if x_max <= x_min:
+        x = np.array([x_min], dtype=float)
+        return x, np.asarray(func(x), dtype=float)
+
+    x = np.linspace(x_min, x_max, max(int(pixels), 1) + 1)
+    if breaks is None:
+        breaks = np.empty(0)
+    breaks = np.asarray(breaks, dtype=float)
+    breaks = np.unique(breaks[(breaks > x_min) & (breaks < x_max)])
+    x = np.unique(np.concatenate([x, breaks, np.nextafter(breaks, -np.inf)]))
+    y = np.asarray(func(x), dtype=float)
+
+    finite = np.isfinite(y)
+    span = np.ptp(y[finite]) if finite.any() else 0.0
+    tol = tolerance * span if span > 0 else tolerance
+    pixel = (x_max - x_min) / pixels
+
+    xs = [x]
+    ys = [y]
+    left, right = x[:-1], x[1:]
+    y_left, y_right = y[:-1], y[1:]
+    # The interval each was split from, so that siblings can be compared
+    parent = np.arange(len(left))
+
+    while len(left) > 0:
+        mid = (left + right) / 2
+        y_mid = np.asarray(func(mid), dtype=float)
+        # Stop once the ends are adjacent floats
+        bad = (np.abs(y_mid - (y_left + y_right) / 2) > tol) & \
+              (mid > left) & (mid < right)
+
+        xs.append(mid[bad])
+        ys.append(y_mid[bad])
+
+        # Below a pixel, intervals whose sibling also fails hold more than
+        # one jump which can't be seen apart, so neither is followed,
+        # unless they hold a break, which is always placed
+        small = (right - left) < pixel
+        counts = np.bincount(parent[bad], minlength=len(parent))
+        bad &= ~(small & (counts[parent] > 1)
+                 & ~_holds_break(breaks, left, right))
+
+        # Split the failing intervals into their two halves
+        n = np.count_nonzero(bad)
+        parent = np.concatenate([np.arange(n), np.arange(n)])
+        left, right = (np.concatenate([left[bad], mid[bad]]),
+                       np.concatenate([mid[bad], right[bad]]))
+        y_left, y_right = (np.concatenate([y_left[bad], y_mid[bad]]),
+                           np.concatenate([y_mid[bad], y_right[bad]]))
+
+    x = np.concatenate(xs)
+    y = np.concatenate(ys)
+    order = np.argsort(x, kind='stable')
+    x, y = x[order], y[order]
+
+    keep = simplify(x, y, tol)
+    return x[keep], y[keep]
+
+
+def snap_breaks(count, breaks, levels):
+    """
+    Returns the smallest x at which count reaches each of levels, found
+    from breaks calculated close to them. count takes and returns arrays
+    and must never decrease, such as the number of cars which have
+    arrived by a time.
+
+    A break found from a formula rounds differently from the count it
+    was derived from, so it can be a few floats either side of the step,
+    where no jump would be sampled. The step is bracketed by moving out
+    from the break in doubling steps and then bisected down to adjacent
+    floats. Non-finite breaks, and those whose step can't be bracketed,
+    are left non-finite.
+    """
+    breaks = np.asarray(breaks, dtype=float)
+    levels = np.asarray(levels, dtype=float)
+    lo = _widen(count, breaks, levels, False)
+    hi = _widen(count, breaks, levels, True)
+
+    # count is below the level at lo and reaches it at hi
+    finite = np.isfinite(lo) & np.isfinite(hi)
+    hi = np.where(finite, hi, np.nan)
+    active = finite & (np.nextafter(lo, np.inf) < hi)
+    while active.any():
+        mid = lo + (hi - lo) / 2
+        mid = np.where((mid > lo) & (mid < hi), mid, np.nextafter(lo, np.inf))
+        reached = count(mid) >= levels
+        hi = np.where(active & reached, mid, hi)
+        lo = np.where(active & ~reached, mid, lo)
+        active = finite & (np.nextafter(lo, np.inf) < hi)
+    return hi
+
+
+def _widen(count, x, levels, reach):
+    # Moves each x away from its step until count reaches the level, or
+    # until it is below it if reach is False. An x which isn't finite, or
+    # runs off to infinity as the level is never crossed, is left there.
+    x = x.copy()
+    step = np.spacing(np.maximum(np.abs(x), 1.0))
+    direction = 1 if reach else -1
+    with np.errstate(invalid='ignore', over='ignore'):
+        moving = ((count(x) >= levels) != reach) & np.isfinite(x)
+        while moving.any():
+            x[moving] += direction * step[moving]
+            step[moving] *= 2
+            moving &= ((count(x) >= levels) != reach) & np.isfinite(x) \
+                & np.isfinite(step)
+    return x
+
+
+def _holds_break(breaks, left, right):
+    # Whether a break lies strictly within each interval
+    if len(breaks) == 0:
+        return np.zeros(len(left), dtype=bool)
+    index = np.minimum(np.searchsorted(breaks, left, side='right'),
+                       len(breaks) - 1)
+    return (breaks[index] > left) & (breaks[index] < right)
+
+
+def simplify(x, y, tol):
+    """
+    Returns a mask of the points to keep so that no removed point is
+    further than tol in y from a straight line between the kept points
+    either side of it, using the Douglas-Peucker algorithm. Points next
+    to non-finite values are always kept.
+    """
+    keep = np.zeros(len(x), dtype=bool)
+    if len(x) == 0:
+        return keep
+    keep[0] = keep[-1] = True
+
+    # Non-finite values can't be interpolated, so split around them
+    finite = np.isfinite(y)
+    keep |= ~finite
+    keep[:-1] |= ~finite[1:]
+    keep[1:] |= ~finite[:-1]
+
+    stack = [(start, end) for start, end
+             in zip(*_segment_bounds(keep)) if end - start > 1]
+    while stack:
+        start, end = stack.pop()
+        if not (finite[start] and finite[end]):
+            keep[start:end + 1] = True
+            continue
+        # Interpolated by the fraction of the way along, as the slope
+        # overflows across a jump between adjacent floats
+        t = (x[start + 1:end] - x[start]) / (x[end] - x[start])
+        error = np.abs(y[start + 1:end] - (y[start] + t * (y[end] - y[start])))
+        worst = np.argmax(error)
+        if error[worst] > tol:
+            split = start + 1 + worst
+            keep[split] = True
+            if split - start > 1:
+                stack.append((start, split))
+            if end - split > 1:
+                stack.append((split, end))
+    return keep
+
+
+def _segment_bounds(keep):
+    # The indices of consecutive kept points
+    indices = np.flatnonzero(keep)
+    return indices[:-1], indices[1:]
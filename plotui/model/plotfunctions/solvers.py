@@ -0,0 +1,37 @@
+import numpy as np
+
+
+def calc_green_time(n_p, h0):
+    """
+    The green time needed for n_p cars to pass, with a headway of h0.
+    """
+    return np.log(n_p) + (h0 * (n_p - 1))
+
+
+def solve_npmax(tg, h0):
+    """
+    Returns the largest number of cars n_p that can pass within a green
+    time tg, i.e. the largest integer for which calc_green_time(n_p, h0)
+    <= tg. A negative tg returns -1.
+
+    tg may be a number or an array. Each value is found by bisection over
+    the integers, so the cost grows with log(tg/h0) rather than tg/h0, and
+    the result is the same as counting up from n_p = 1.
+    """
+    tg = np.asarray(tg, dtype=float)
+
+    # The green time of lo cars always fits within tg and the green time
+    # of hi cars never does, as calc_green_time(n_p, h0) > h0*(n_p - 1)
+    lo = np.ones(tg.shape, dtype=np.int64)
+    hi = (np.maximum(tg, 0) / h0).astype(np.int64) + 2
+
+    while np.any(hi - lo > 1):
+        mid = (lo + hi) // 2
+        fits = calc_green_time(mid, h0) <= tg
+        lo = np.where(fits, mid, lo)
+        hi = np.where(fits, hi, mid)
+
+    n_p = np.where(tg < 0, -1, lo)
+    if n_p.ndim == 0:
+        return int(n_p)
+    return n_p
@@ -0,0 +1,191 @@
+import importlib
+import json
+import os
+import sys
+import warnings
+from collections import OrderedDict
+
+from common import PlotType, DisplayUserOptions
+from model.plotfunctions.manifests import BUILTINS
+
+# The entry point group in which installed packages register plot functions
+ENTRY_POINT_GROUP = 'plotui.plot_functions'
+
+# Directories of plot function manifests, separated by os.pathsep, which
+# are searched as well as the user's models directory
+MODELS_PATH_VAR = 'PLOTUI_MODELS_PATH'
+USER_MODELS_DIR = os.path.join(os.path.expanduser('~'), '.plotui', 'models')
+
+
+class PlotFunctionInfo(object):
+    """
+    The metadata of a plot function, which is available without importing
+    the module the plot function is defined in. target is the plot
+    function class as 'module:class', which is only imported once a plot
+    of its type is created. path is a directory to import it from.
+    """
+    def __init__(self, name, target, xvar_strings, yvar_strings,
+            constant_strings=None, user_option_args=None, path=None):
+        self.name = name
+        self.target = target
+        self.xvar_strings = list(xvar_strings)
+        self.yvar_strings = list(yvar_strings)
+        self.constant_strings = list(constant_strings or [])
+        if user_option_args is None:
+            user_option_args = DisplayUserOptions()
+        self.user_option_args = user_option_args
+        self.path = path
+        self._class = None
+
+    @classmethod
+    def from_dict(cls, data, path=None):
+        """
+        Creates the metadata from a manifest, see README.md.
+        """
+        return cls(data['name'], data['target'], data['xvars'], data['yvars'],
+                   data.get('constants'),
+                   DisplayUserOptions(**data.get('user_options', {})), path)
+
+    @property
+    def loaded(self):
+        return self._class is not None
+
+    def load(self):
+        """
+        Imports and returns the plot function class.
+        """
+        if self._class is None:
+            module_name, class_name = self.target.split(':')
+            if self.path is not None and self.path not in sys.path:
+                sys.path.append(self.path)
+            module = importlib.import_module(module_name)
+            self._class = getattr(module, class_name)
+        return self._class
+
+    def create(self):
+        return self.load()()
+
+
+class PlotFunctionRegistry(object):
+    """
+    The plot functions which can be plotted, in the order they were
+    registered. Plot types are identified by name, but the built in plot
+    types can also be given as a PlotType.
+    """
+    def __init__(self):
+        self._infos = OrderedDict()
+        # (source, exception) of each plot function which failed to load
+        self.errors = []
+
+    def __contains__(self, plot_type):
+        return self._get_name(plot_type) in self._infos
+
+    def register(self, info):
+        if info.name in self._infos:
+            raise ValueError(f"A plot function named '{info.name}' is "
+                             f"already registered")
+        self._infos[info.name] = info
+
+    def get(self, plot_type):
+        return self._infos[self._get_name(plot_type)]
+
+    def get_names(self):
+        return list(self._infos)
+
+    def discover(self, directories=None):
+        """
+        Registers the plot functions of installed packages and of the
+        manifests in the models directories.
+        """
+        if directories is None:
+            directories = get_models_dirs()
+        self.load_entry_points()
+        for directory in directories:
+            self.load_directory(directory)
+
+    def load_entry_points(self, group=ENTRY_POINT_GROUP):
+        """
+        Registers the plot functions of the entry points in group. Each
+        entry point refers to a PlotFunctionInfo, a list of them or a
+        function returning either, which should be defined in a module
+        which is quick to import.
+        """
+        for entry_point in _get_entry_points(group):
+            try:
+                infos = entry_point.load()
+                if callable(infos):
+                    infos = infos()
+                if isinstance(infos, PlotFunctionInfo):
+                    infos = [infos]
+                for info in infos:
+                    self.register(info)
+            except Exception as e:
+                self._add_error(entry_point.name, e)
+
+    def load_directory(self, directory):
+        """
+        Registers a plot function for every .json manifest in directory.
+        The modules they refer to are imported from the same directory.
+        """
+        if not os.path.isdir(directory):
+            return
+        for file_name in sorted(os.listdir(directory)):
+            if not file_name.endswith('.json'):
+                continue
+            file_name = os.path.join(directory, file_name)
+            try:
+                with open(file_name) as f:
+                    data = json.load(f)
+                self.register(PlotFunctionInfo.from_dict(data, directory))
+            except Exception as e:
+                self._add_error(file_name, e)
+
+    def _add_error(self, source, error):
+        self.errors.append((source, error))
+        warnings.warn(f"Unable to register plot function from {source}: "
+                      f"{error}")
+
+    def _get_name(self, plot_type):
+        if isinstance(plot_type, PlotType):
+            return PlotType.to_string(plot_type)
+        return plot_type
+
+
+def _get_entry_points(group):
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        return []
+    try:
+        return entry_points(group=group)
+    except TypeError:
+        # Before Python 3.10 the entry points are grouped in a dictionary
+        return entry_points().get(group, [])
+
+
+def get_models_dirs():
+    directories = [USER_MODELS_DIR]
+    if os.environ.get(MODELS_PATH_VAR):
+        directories += os.environ[MODELS_PATH_VAR].split(os.pathsep)
+    return directories
+
+
+def register_builtins(registry):
+    for manifest in BUILTINS:
+        registry.register(PlotFunctionInfo.from_dict(manifest))
+
+
+_registry = None
+
+
+def get_registry():
+    """
+    Returns the registry shared by the whole program, which is created
+    with the built in plot functions and those discovered on first use.
+    """
+    global _registry
+    if _registry is None:
+        _registry = PlotFunctionRegistry()
+        register_builtins(_registry)
+        _registry.discover()
+    return _registry
@@ -0,0 +1,128 @@
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from common import PlotArgs
+
+# Changed whenever the format of session files changes
+SESSION_VERSION = 1
+
+
+class SessionPlot(object):
+    """
+    A plot of a session, its plot type name, PlotArgs and constants, or
+    None for plot functions without constants.
+    """
+    def __init__(self, plot_type, plot_args, constants=None):
+        self.plot_type = plot_type
+        self.plot_args = plot_args
+        self.constants = constants
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['type'], PlotArgs(
+            data['xvar'], data.get('xmin'), data.get('xmax'), data['yvar'],
+            data.get('ymin'), data.get('ymax'),
+            ), data.get('constants'))
+
+    def to_dict(self):
+        data = {'type': self.plot_type}
+        if self.constants:
+            # Numbers keep their type, so the plot data is cached under the
+            # same constants when the session is loaded
+            data['constants'] = [val.item() if isinstance(val, np.generic)
+                                 else val for val in self.constants]
+        for name in ('xvar', 'xmin', 'xmax', 'yvar', 'ymin', 'ymax'):
+            val = getattr(self.plot_args, name)
+            if val is not None:
+                data[name] = val.item() if isinstance(val, np.generic) else val
+        return data
+
+    def overlaps(self, xmin, xmax):
+        """
+        Returns whether the x range of the plot overlaps xmin to xmax,
+        which it's assumed to if it has no x range.
+        """
+        if self.plot_args.xmin is None or self.plot_args.xmax is None:
+            return True
+        return self.plot_args.xmin <= xmax and self.plot_args.xmax >= xmin
+
+
+class Session(object):
+    """
+    The state of the main window which is saved to session files: the
+    plots, the title and axis labels, and the axis limits, or None if
+    the axes are autoscaled.
+
+    Session files are JSON in the same form as a job of a batch job file,
+    see batch.py, so they can also be rendered without a display.
+    """
+    def __init__(self, plots=None, title='Title', xlabel='x axis',
+            ylabel='y axis', limits=None):
+        self.plots = list(plots or [])
+        self.title = title
+        self.xlabel = xlabel
+        self.ylabel = ylabel
+        self.limits = limits
+
+    @classmethod
+    def from_dict(cls, data):
+        version = data.get('version', SESSION_VERSION)
+        if version > SESSION_VERSION:
+            raise ValueError(f"Session version {version} is newer than "
+                             f"this program supports")
+        limits = data.get('limits')
+        if limits is not None and None in limits:
+            limits = None
+        return cls([SessionPlot.from_dict(plot) for plot in data['plots']],
+                   data.get('title', 'Title'), data.get('xlabel', 'x axis'),
+                   data.get('ylabel', 'y axis'), limits)
+
+    def to_dict(self):
+        data = {
+            'version': SESSION_VERSION,
+            'title': self.title,
+            'xlabel': self.xlabel,
+            'ylabel': self.ylabel,
+            'plots': [plot.to_dict() for plot in self.plots],
+            }
+        # Without limits the axes are autoscaled, as in a batch job
+        if self.limits is not None:
+            data['limits'] = [float(val) for val in self.limits]
+        return data
+
+    @classmethod
+    def load(cls, file_name):
+        with open(file_name) as f:
+            return cls.from_dict(json.load(f))
+
+    def save(self, file_name):
+        """
+        Writes the session to file_name, replacing it only once the whole
+        session has been written.
+        """
+        directory = os.path.dirname(os.path.abspath(file_name))
+        fd, temp_name = tempfile.mkstemp('.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.to_dict(), f, indent=2)
+            os.replace(temp_name, file_name)
+        except BaseException:
+            os.remove(temp_name)
+            raise
+
+    def get_load_order(self):
+        """
+        Returns the indices of the plots in the order to calculate them
+        in, those which can be seen within the axis limits first.
+        """
+        indices = range(len(self.plots))
+        if self.limits is None:
+            return list(indices)
+        xmin, xmax = self.limits[:2]
+        visible = [self.plots[index].overlaps(xmin, xmax)
+                   for index in indices]
+        return ([index for index in indices if visible[index]]
+                + [index for index in indices if not visible[index]])
@@ -0,0 +1,189 @@
+import hashlib
+import os
+import sys
+import tempfile
+import warnings
+import zipfile
+
+import numpy as np
+
+import common
+
+# The directory of the store shared by every process, which is disabled
+# if set to an empty string, and its size in megabytes
+CACHE_DIR_VAR = 'PLOTUI_CACHE_DIR'
+CACHE_SIZE_VAR = 'PLOTUI_CACHE_SIZE'
+USER_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.plotui', 'cache')
+DEFAULT_CACHE_SIZE = 256
+
+# Changed whenever the meaning of the stored results changes other than
+# through the code of the plot functions
+STORE_VERSION = 1
+
+# The errors of a file which is being written by another process or was
+# left broken, which are treated as a miss
+_READ_ERRORS = (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile)
+
+
+class ResultStore(object):
+    """
+    A store of calculated plot data on disk, shared by every process using
+    the same directory. Each entry is a compressed .npz file named by the
+    hash of its key, which should hold everything the data depends on.
+
+    Files are replaced atomically, so a process never reads a partly
+    written entry. Once the files take more than max_bytes, those least
+    recently used, by modification time, are removed first.
+    """
+    def __init__(self, directory, max_bytes=DEFAULT_CACHE_SIZE * 2**20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Returns the entry (xdata, {yvar: ydata}) for the key, or None if
+        it isn't stored.
+        """
+        file_name = self._file_name(key)
+        try:
+            with np.load(file_name) as data:
+                # Guard against a hash collision
+                if str(data['key']) != repr(key):
+                    self.misses += 1
+                    return None
+                xdata = data['x']
+                ydata = {str(yvar): data[f'y{index}'] for index, yvar
+                         in enumerate(data['yvars'])}
+            # Mark it as recently used
+            os.utime(file_name)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except _READ_ERRORS:
+            self.misses += 1
+            self._remove(file_name)
+            return None
+
+        self.hits += 1
+        return xdata, ydata
+
+    def put(self, key, entry):
+        xdata, ydata = entry
+        arrays = {f'y{index}': np.asarray(data)
+                  for index, data in enumerate(ydata.values())}
+        # The store is only an optimisation, so failures are ignored
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temp_name = tempfile.mkstemp('.tmp', dir=self.directory)
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez_compressed(f, key=repr(key), x=np.asarray(xdata),
+                                    yvars=np.array(list(ydata), dtype=str),
+                                    **arrays)
+            os.replace(temp_name, self._file_name(key))
+        except OSError:
+            self._remove(temp_name)
+            return
+        self._evict()
+
+    def clear(self):
+        for entry in self._scan():
+            self._remove(entry.path)
+        self.hits = 0
+        self.misses = 0
+
+    def size(self):
+        return sum(entry.stat().st_size for entry in self._scan())
+
+    def _evict(self):
+        entries = []
+        for entry in self._scan():
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for mtime, size, path in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def _scan(self):
+        try:
+            return [entry for entry in os.scandir(self.directory)
+                    if entry.name.endswith('.npz')]
+        except OSError:
+            return []
+
+    def _remove(self, file_name):
+        try:
+            os.remove(file_name)
+        except OSError:
+            pass
+
+    def _file_name(self, key):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.directory, f'{digest}.npz')
+
+
+_code_versions = {}
+
+
+def get_code_version(plot_model):
+    """
+    Returns a hash of the source of the plot function, the modules next
+    to it and common.py, which it may depend on, so that stored results
+    are only used by the same code.
+    """
+    module = sys.modules[type(plot_model).__module__]
+    directory = os.path.dirname(os.path.abspath(getattr(module, '__file__',
+                                                        '')))
+    if directory not in _code_versions:
+        digest = hashlib.sha1(str(STORE_VERSION).encode())
+        try:
+            file_names = [os.path.join(directory, file_name) for file_name
+                          in sorted(os.listdir(directory))
+                          if file_name.endswith('.py')]
+        except OSError:
+            file_names = []
+        for file_name in file_names + [os.path.abspath(common.__file__)]:
+            try:
+                with open(file_name, 'rb') as f:
+                    digest.update(os.path.basename(file_name).encode()
+                                  + f.read())
+            except OSError:
+                pass
+        _code_versions[directory] = digest.hexdigest()
+    return _code_versions[directory]
+
+
+_store = None
+
+
+def get_result_store():
+    """
+    Returns the store shared by the whole program, in the directory given
+    by PLOTUI_CACHE_DIR or "~/.plotui/cache", or None if it's disabled.
+    """
+    global _store
+    directory = os.environ.get(CACHE_DIR_VAR, USER_CACHE_DIR)
+    if not directory:
+        return None
+    if _store is None or _store.directory != directory:
+        size = os.environ.get(CACHE_SIZE_VAR, DEFAULT_CACHE_SIZE)
+        try:
+            size = float(size)
+            if not 0 <= size < float('inf'):
+                raise ValueError(size)
+        except ValueError:
+            warnings.warn(f"Ignoring {CACHE_SIZE_VAR} '{size}', which isn't "
+                          f"a number of megabytes")
+            size = DEFAULT_CACHE_SIZE
+        _store = ResultStore(directory, int(size * 2**20))
+    return _store
@@ -0,0 +1,89 @@
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from model.plotfunctions.model2 import Model2
+from model.plotfunctions.model2batch import BatchModel2
+
+# The output variables of a Model2 run, in the order of the last axis of
+# the arrays returned by run_model2 and sweep_model2
+OUTPUT_VARS = ['t', 'tw', 'psi_a', 'psi_c', 'psi_d', 'psi_ar', 'psi_ag']
+
+
+def constant_grid(L, l, v, Qi, Qj, tgmax, N):
+    """
+    Returns every combination of the given constant values as a list of
+    constant vectors, in the order used by Model2.set_constant_vals.
+    """
+    return [list(vals) for vals in itertools.product(L, l, v, Qi, Qj, tgmax,
+                                                     N)]
+
+
+def run_model2(constants, N_min, N_max, checkpoint_dir=None,
+               solver='fixed'):
+    """
+    Runs Model2 with one set of constants over N_min to N_max. Returns an
+    array of shape (N, output variable), see OUTPUT_VARS.
+
+    If checkpoint_dir is given, the cycle checkpoints are shared through
+    it with earlier and later runs. solver is the mode of the CycleSolver.
+    """
+    model = Model2()
+    model.set_constant_vals(constants)
+    model.restore_defaults()
+    model.set_solver(solver)
+    if checkpoint_dir is not None:
+        model.set_checkpoints(directory=checkpoint_dir)
+    model._x_is_N(N_min, N_max, None)
+    return np.column_stack([model.t_l, model.tw_l, model.psi_a_l,
+                            model.psi_c_l, model.psi_d_l, model.psi_ar_l,
+                            model.psi_ag_l])
+
+
+def iter_model2_sweep(grid, N_min, N_max, workers=None,
+                      checkpoint_dir=None, solver='fixed'):
+    """
+    Runs Model2 for every constant vector in grid across a pool of
+    processes. Yields (index, result) tuples as soon as each run finishes,
+    where index is the position of the constants in grid.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_model2, constants, N_min, N_max,
+                                   checkpoint_dir, solver): index
+                   for index, constants in enumerate(grid)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def sweep_model2(grid, N_min, N_max, workers=None, on_result=None,
+                 checkpoint_dir=None, solver='fixed'):
+    """
+    Runs Model2 for every constant vector in grid across a pool of
+    processes. Returns an array of shape (constants, N, output variable),
+    in the same order as grid whatever order the runs finish in.
+
+    on_result(index, result) is called with each partial result as soon
+    as its run finishes.
+    """
+    results = [None] * len(grid)
+    for index, result in iter_model2_sweep(grid, N_min, N_max, workers,
+                                           checkpoint_dir, solver):
+        results[index] = result
+        if on_result is not None:
+            on_result(index, result)
+
+    if len(results) == 0:
+        return np.empty((0, 0, len(OUTPUT_VARS)))
+    return np.stack(results)
+
+
+def sweep_model2_batch(grid, N_min, N_max):
+    """
+    Runs Model2 for every constant vector in grid in a single process,
+    simulating them in lockstep with a BatchModel2. Returns an array of
+    shape (constants, N, output variable) as sweep_model2, with the
+    results of the 'fixed' solver. The results of runs for which Model2
+    raises an error are nan rather than the error being raised.
+    """
+    return BatchModel2(grid).run_sweep(N_min, N_max)
@@ -0,0 +1,110 @@
+import argparse
+import sys
+import warnings
+
+import numpy as np
+
+from model.plotfunctions import backend
+from model.sweep import run_model2
+
+# The errors Model2 raises for constants it can't simulate, which must be
+# raised by both backends
+MODEL_ERRORS = (ValueError, OverflowError, ZeroDivisionError)
+
+
+def get_cases(count, seed=0):
+    """
+    Returns the constant vectors to compare, the defaults and a few
+    heavily loaded bridges followed by count random ones.
+    """
+    cases = [
+        [200, 4.8, 40, 10, 10, 120, 5],
+        [200, 4.8, 40, 30, 20, 120, 5],
+        [500, 4.8, 30, 25, 5, 60, 5],
+        [100, 4, 50, 2, 40, 200, 5],
+        ]
+    rng = np.random.default_rng(seed)
+    for index in range(count):
+        cases.append([float(rng.uniform(50, 600)), float(rng.uniform(3, 8)),
+                      float(rng.uniform(20, 60)), int(rng.integers(1, 40)),
+                      int(rng.integers(1, 40)), int(rng.integers(30, 200)), 5])
+    return cases
+
+
+def run(name, constants, N_min, N_max, solver):
+    backend.set_backend(name)
+    try:
+        return run_model2(constants, N_min, N_max, solver=solver)
+    except MODEL_ERRORS as e:
+        return type(e).__name__
+
+
+def compare(constants, N_min, N_max, solver):
+    """
+    Runs Model2 with both backends. Returns the largest difference of
+    their results relative to the Python results, 0 if they're bit for
+    bit the same and inf if they differ in shape, in which values aren't
+    finite or in the error raised.
+    """
+    expected = run('python', constants, N_min, N_max, solver)
+    result = run('numba', constants, N_min, N_max, solver)
+    if isinstance(expected, str) or isinstance(result, str):
+        return 0.0 if expected == result else np.inf
+    if expected.shape != result.shape:
+        return np.inf
+    if np.array_equal(expected, result, equal_nan=True):
+        return 0.0
+
+    finite = np.isfinite(expected)
+    if not np.array_equal(finite, np.isfinite(result)):
+        return np.inf
+    error = np.abs(result[finite] - expected[finite])
+    return float(np.max(error / np.maximum(np.abs(expected[finite]),
+                                           np.finfo(float).tiny)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare the compiled Model2 kernels against the Python "
+                    "code.")
+    parser.add_argument('-n', '--count', type=int, default=50,
+        help="number of random constant vectors (default: 50)")
+    parser.add_argument('-N', '--N-max', type=int, default=400,
+        help="largest N of each run (default: 400)")
+    parser.add_argument('-s', '--seed', type=int, default=0,
+        help="seed of the random constant vectors")
+    parser.add_argument('-t', '--tolerance', type=float, default=1e-9,
+        help="largest relative difference allowed, as np.log and the log "
+             "numba compiles to can differ in the last bit "
+             "(default: 1e-9)")
+    args = parser.parse_args(argv)
+
+    try:
+        backend.set_backend('numba')
+    except ImportError as e:
+        print(f"numba isn't available, so there is nothing to compare: {e}")
+        return 0
+
+    cases = get_cases(args.count, args.seed)
+    failures = 0
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        for solver in ('fixed', 'converged'):
+            exact = 0
+            for constants in cases:
+                difference = compare(constants, 1, args.N_max, solver)
+                exact += difference == 0
+                if difference > args.tolerance:
+                    failures += 1
+                    print(f"{solver} {constants}: differs by {difference:.3g}")
+            print(f"{solver:<10} {exact}/{len(cases)} bit for bit the same")
+
+    if failures:
+        print(f"{failures} run(s) differ by more than {args.tolerance}",
+              file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
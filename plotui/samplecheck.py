@@ -0,0 +1,67 @@
+import argparse
+import sys
+
+import numpy as np
+
+from model.plotfunctions.model1 import Model1PlotFunction
+
+
+def get_cases():
+    """
+    Returns the (constants, tg_max) to check, the defaults and arrival
+    rates high enough that tw jumps several times per pixel.
+    """
+    return [
+        ([200, 4.8, 40, 10, 5], 120),
+        ([200, 4.8, 40, 60, 5], 2000),
+        ([500, 4.8, 30, 120, 5], 500),
+        ([100, 4, 50, 200, 3], 3000),
+        ]
+
+
+def check(constants, tg_max, pixels, points):
+    """
+    Samples tw of Model 1 from 0 to tg_max adaptively and at points
+    evenly spaced values. Returns the largest difference of the dense
+    values from the adaptive samples joined by straight lines, and the
+    tolerance it should be within.
+    """
+    model = Model1PlotFunction()
+    model.set_constant_vals(constants)
+    model.restore_defaults()
+    model.set_resolution(pixels)
+    tg = model.get_xdata('tg', 0, tg_max)
+    tw = model.get_ydata('tw', None, None, tg)
+
+    dense_tg = np.linspace(0, tg_max, points)
+    dense_tw = model.calc_tw(dense_tg)
+    error = np.abs(np.interp(dense_tg, tg, tw) - dense_tw)
+    return float(error.max()), model.tolerance * float(np.ptp(dense_tw))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare the adaptive sampling of Model 1 against "
+                    "dense sampling.")
+    parser.add_argument('-p', '--pixels', type=int, default=1000,
+        help="pixels the adaptive sampling is for (default: 1000)")
+    parser.add_argument('-n', '--points', type=int, default=1000001,
+        help="number of dense samples (default: 1000001)")
+    args = parser.parse_args(argv)
+
+    failures = 0
+    for constants, tg_max in get_cases():
+        error, tolerance = check(constants, tg_max, args.pixels, args.points)
+        print(f"{constants} tg 0-{tg_max}: off by {error:.4g}, "
+              f"tolerance {tolerance:.4g}")
+        failures += error > tolerance
+
+    if failures:
+        print(f"{failures} case(s) are further from the dense samples than "
+              f"the tolerance", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class Tracer(object):
+    """
+    Records the wall time of named stages, e.g. the model calculation or
+    the canvas draw, along with arguments such as the number of points.
+    Nothing is recorded unless it is enabled.
+    """
+    def __init__(self, max_events=100000):
+        self.enabled = False
+        self._events = deque(maxlen=max_events)
+        self._last = {}
+        self._origin = time.perf_counter()
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+
+    def clear(self):
+        self._events.clear()
+        self._last.clear()
+
+    def stage(self, name, **args):
+        """
+        Returns a context which records the time spent within it as the
+        stage name. The context returns a dictionary of arguments, which
+        can be added to during the stage.
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return self._stage(name, args)
+
+    @contextmanager
+    def _stage(self, name, args):
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            end = time.perf_counter()
+            event = (name, start - self._origin, end - start,
+                     threading.get_ident(), args)
+            self._events.append(event)
+            self._last[name] = event
+
+    def get_summary(self):
+        """
+        Returns (name, duration, args) of the latest event of each stage.
+        """
+        return [(name, duration, args) for name, start, duration, tid, args
+                in self._last.values()]
+
+    def export_chrome_trace(self, file_name):
+        """
+        Writes the recorded events in the Chrome trace event format, which
+        can be opened in chrome://tracing or Perfetto.
+        """
+        pid = os.getpid()
+        trace_events = []
+        for name, start, duration, tid, args in list(self._events):
+            trace_events.append({
+                'name': name, 'ph': 'X', 'pid': pid, 'tid': tid,
+                'ts': start * 1e6, 'dur': duration * 1e6, 'args': args,
+                })
+        with open(file_name, 'w') as f:
+            json.dump({'traceEvents': trace_events}, f)
+
+
+class _NullStage(object):
+    """
+    The context returned whilst the tracer is disabled, which does
+    nothing. Arguments added to it are discarded.
+    """
+    def __enter__(self):
+        return {}
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def traced(name):
+    """
+    A decorator which records every call of a function as a stage of the
+    tracer whilst it is enabled.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with tracer.stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# The tracer shared by the whole program
+tracer = Tracer()
@@ -0,0 +1,58 @@
+import views.styles as st
+
+
+class DiagnosticsFrame(st.SubFrame):
+    """
+    The frame for recording and displaying the time spent in each stage
+    of plotting, and for recording the state of the models.
+    """
+    def _create_widgets(self):
+        self._title_lbl = st.TitleLabel(self, "Diagnostics")
+        self._record_chk = st.BoolCheck(self, "Record timings",
+            command=self.set_tracing)
+        self._clear_btn = st.Button(self, "Clear", self.clear)
+        self._model_chk = st.BoolCheck(self, "Record model traces",
+            command=self.set_model_tracing)
+        self._summary_lbl = st.Label(self, "")
+        self._startup_lbl = st.Label(self, "")
+        self._file_le = st.StringLabEnt(self, "Trace file:", "trace")
+        self._export_btn = st.Button(self, "Export trace", self.export)
+
+    def _position_widgets(self):
+        self._title_lbl.grid(row=0, column=0, columnspan=3)
+        self._record_chk.grid(row=1, column=0, sticky='w')
+        self._clear_btn.grid(row=1, column=1, sticky='w')
+        self._file_le.grid(row=2, column=0, sticky='w')
+        self._export_btn.grid(row=2, column=1, sticky='w')
+        self._model_chk.grid(row=3, column=0, sticky='w')
+        self._startup_lbl.grid(row=4, column=0, columnspan=3, sticky='w')
+        self._summary_lbl.grid(row=5, column=0, columnspan=3, sticky='w')
+
+    def _configure_grid(self):
+        self.grid_columnconfigure(2, weight=1)
+
+    def set_tracing(self):
+        self._c.set_tracing(self._record_chk.get())
+
+    def set_model_tracing(self):
+        self._c.set_model_tracing(self._model_chk.get())
+
+    def clear(self):
+        self._c.clear_trace()
+
+    def export(self):
+        self._c.export_trace(self._file_le.get())
+
+    def show_summary(self, summary):
+        lines = []
+        for name, duration, args in summary:
+            line = f"{name}: {duration * 1000:.1f} ms"
+            if args:
+                line += " (" + ", ".join(f"{key}={val}" for key, val
+                                         in args.items()) + ")"
+            lines.append(line)
+        self._summary_lbl.configure(text="\n".join(lines))
+
+    def show_startup_time(self, window_time, plot_time):
+        self._startup_lbl.configure(text=f"Startup: window shown in "
+            f"{window_time:.2f} s, plot ready in {plot_time:.2f} s")
@@ -9,18 +9,40 @@ class ExportOptionsFrame(st.SubFrame):
         self._title_lbl = st.TitleLabel(self, "Export Options")
         self._export_lbl = st.Label(self, "Export type:")
         self._export_rdb = st.Radiobuttons(self, ["PNG image", "LaTeX data"])
+        self._mode_lbl = st.Label(self, "Data export mode:")
+        self._mode_rdb = st.Radiobuttons(self, ["Share x data",
+            "Sequentially"])
         self._file_le = st.StringLabEnt(self, "File name:", "graph")
         self._export_btn = st.Button(self, "Export", self.export)
+        self._session_lbl = st.SubTitleLabel(self, "Session")
+        self._session_le = st.StringLabEnt(self, "Session file:", "session")
+        self._save_session_btn = st.Button(self, "Save session",
+            self.save_session)
+        self._load_session_btn = st.Button(self, "Load session",
+            self.load_session)
 
     def _position_widgets(self):
         self._title_lbl.grid(row=0)
         self._export_lbl.grid(row=1, sticky='w')
         self._export_rdb.grid(row=2, sticky='w')
-        self._file_le.grid(row=3, sticky='w')
-        self._export_btn.grid(row=4, sticky='w')
+        self._mode_lbl.grid(row=3, sticky='w')
+        self._mode_rdb.grid(row=4, sticky='w')
+        self._file_le.grid(row=5, sticky='w')
+        self._export_btn.grid(row=6, sticky='w')
+        self._session_lbl.grid(row=7, sticky='w')
+        self._session_le.grid(row=8, sticky='w')
+        self._save_session_btn.grid(row=9, sticky='w')
+        self._load_session_btn.grid(row=10, sticky='w')
 
     def _configure_grid(self):
         self.grid_columnconfigure(0, weight=1)
 
     def export(self):
-        self._c.export(self._export_rdb.get_index(), self._file_le.get())
+        self._c.export(self._export_rdb.get_index(), self._file_le.get(),
+            self._mode_rdb.get_index())
+
+    def save_session(self):
+        self._c.save_session(self._session_le.get())
+
+    def load_session(self):
+        self._c.load_session(self._session_le.get())
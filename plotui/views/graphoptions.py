@@ -22,6 +22,12 @@ class GraphOptionsFrame(st.SubFrame):
     def _configure_grid(self):
         self.grid_columnconfigure(0, weight=1)
 
+    def set_labels(self, title, xlabel, ylabel):
+        self._graph_label_options.set_labels(title, xlabel, ylabel)
+
+    def set_limits(self, limits):
+        self._graph_scaling_options.set_limits(limits)
+
 
 class GraphLabelOptionsFrame(st.SubSubFrame):
     """
@@ -54,6 +60,11 @@ class GraphLabelOptionsFrame(st.SubSubFrame):
     def set_ylabel(self):
         self._c.set_ylabel(self._ylabel_entry.get())
 
+    def set_labels(self, title, xlabel, ylabel):
+        self._title_entry.set(title)
+        self._xlabel_entry.set(xlabel)
+        self._ylabel_entry.set(ylabel)
+
 
 class GraphScalingOptionsFrame(st.SubSubFrame):
     """
@@ -88,10 +99,13 @@ class GraphScalingOptionsFrame(st.SubSubFrame):
         tup = self._c.autoscale_axis()
         if tup is None:
             return
-        self._xmin_le.set(tup[0])
-        self._xmax_le.set(tup[1])
-        self._ymin_le.set(tup[2])
-        self._ymax_le.set(tup[3])
+        self.set_limits(tup)
+
+    def set_limits(self, limits):
+        self._xmin_le.set(limits[0])
+        self._xmax_le.set(limits[1])
+        self._ymin_le.set(limits[2])
+        self._ymax_le.set(limits[3])
 
 
 class GraphTickMarkOptions(st.SubSubFrame):
@@ -3,10 +3,12 @@ from tkinter import messagebox
 from controllers import Controller
 import views.styles as st
 from views.setconstantswindow import SetConstantsWindow
+from views.tracewindow import TraceWindow
 from views.graphoptions import GraphOptionsFrame
 from views.exportoptions import ExportOptionsFrame
 from views.plotoptions import MainPlotOptionsFrame
 from views.plot import PlotFrame
+from views.diagnostics import DiagnosticsFrame
 
 
 class MainWindowFrame(st.MainFrame):
@@ -22,12 +24,14 @@ class MainWindowFrame(st.MainFrame):
         self._graph_options = GraphOptionsFrame(self, self._c)
         self._export_options = ExportOptionsFrame(self, self._c)
         self._plot_options = MainPlotOptionsFrame(self, self._c)
+        self._diagnostics = DiagnosticsFrame(self, self._c)
 
     def _position_widgets(self):
         self._graph_options.grid(row=0, column=0, sticky="nsew")
         self._plot.grid(row=0, column=1, rowspan=2, sticky="nsew")
         self._export_options.grid(row=1, column=0, sticky="nsew")
         self._plot_options.grid(row=2, column=0, columnspan=2, sticky="nsew")
+        self._diagnostics.grid(row=3, column=0, columnspan=2, sticky="nsew")
 
     def _configure_grid(self):
         self.rowconfigure(0, weight=1)
@@ -36,15 +40,51 @@ class MainWindowFrame(st.MainFrame):
         self.columnconfigure(0, weight=1)
         self.columnconfigure(1, weight=1)
 
+    def load_plot(self):
+        self._plot.load_canvas()
+
+    def close(self):
+        self._c.close()
+
+    def show_startup_time(self, window_time, plot_time):
+        self._diagnostics.show_startup_time(window_time, plot_time)
+
     def redraw_canvas(self):
         self._plot.redraw_canvas()
 
     def get_plot_args(self, key):
         return self._plot_options.get_plot_args(key)
 
+    def set_plot_busy(self, key, busy):
+        self._plot_options.set_plot_busy(key, busy)
+
+    def get_plot_keys(self):
+        return self._plot_options.get_plot_keys()
+
+    def get_plot_type(self, key):
+        return self._plot_options.get_plot_type(key)
+
+    def add_plot(self, plot_type, plot_args=None):
+        return self._plot_options.load_plot(plot_type, plot_args)
+
+    def clear_plots(self):
+        self._plot_options.clear_plots()
+
+    def set_labels(self, title, xlabel, ylabel):
+        self._graph_options.set_labels(title, xlabel, ylabel)
+
+    def set_limits(self, limits):
+        self._graph_options.set_limits(limits)
+
     def init_set_constants_window(self, key, plot_type):
         window = SetConstantsWindow(self, self._c, key, plot_type)
 
+    def show_trace(self, key, tables):
+        window = TraceWindow(self, self._c, key, tables)
+
+    def show_diagnostics(self, summary):
+        self._diagnostics.show_summary(summary)
+
     def export_png(self, file_name):
         self._plot.export_png(file_name)
 
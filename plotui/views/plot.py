@@ -1,21 +1,53 @@
-﻿from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-
-from views.styles import SubFrame
+﻿from tracing import tracer
+from views.styles import SubFrame, Label
 
 
 class PlotFrame(SubFrame):
     """
-    The visual design for the Plot frame.
+    The visual design for the Plot frame. The canvas is created by
+    load_canvas, so that the window can be shown before matplotlib is
+    imported.
     """
+    def _init_variables(self):
+        self._redraw_pending = False
+        self._canvas = None
+
     def _create_widgets(self):
-        self._canvas = FigureCanvasTkAgg(self._c.get_plot_figure(), self)
-        self._plot = self._canvas.get_tk_widget()
+        self._loading_lbl = Label(self, "Loading plot...")
 
     def _position_widgets(self):
+        self._loading_lbl.grid()
+
+    def load_canvas(self):
+        if self._canvas is not None:
+            return
+        with tracer.stage('PlotFrame.load_canvas'):
+            import matplotlib
+            matplotlib.use('TkAgg')
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+            self._canvas = FigureCanvasTkAgg(self._c.get_plot_figure(), self)
+            self._plot = self._canvas.get_tk_widget()
+        self._loading_lbl.destroy()
         self._plot.grid()
 
+        # Draw any changes made whilst the canvas was loading
+        if self._redraw_pending:
+            self.after_idle(self._draw)
+
     def redraw_canvas(self):
-        self._canvas.draw()
+        # Requests are coalesced into a single draw once Tk is idle
+        if not self._redraw_pending:
+            self._redraw_pending = True
+            if self._canvas is not None:
+                self.after_idle(self._draw)
+
+    def _draw(self):
+        self._redraw_pending = False
+        with tracer.stage('FigureCanvasTkAgg.draw'):
+            self._canvas.draw()
+        self._c.canvas_drawn()
 
     def export_png(self, file_name):
+        self.load_canvas()
         self._canvas.print_png(file_name)
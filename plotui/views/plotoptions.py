@@ -2,7 +2,7 @@ import tkinter as tk
 import uuid
 
 import views.styles as st
-from common import PlotType, PlotArgs
+from common import PlotArgs
 
 
 class MainPlotOptionsFrame(st.SubFrame):
@@ -16,23 +16,51 @@ class MainPlotOptionsFrame(st.SubFrame):
         self._title_lbl = st.TitleLabel(self, "Plot Options")
         self._add_plot_btn = st.Button(self, "Add plot", self.add_plot)
         self._type_cmb = st.StringCombo(self, self._c.get_functions())
+        self._update_all_btn = st.Button(self, "Redraw all plots",
+            self.update_all_plots)
         self._plots_title_lbl = st.SubTitleLabel(self, text="Plots")
 
     def _position_widgets(self):
         self._title_lbl.grid(row=0, column=0, columnspan=2)
         self._add_plot_btn.grid(row=1, column=0, sticky='w')
         self._type_cmb.grid(row=1, column=1, sticky='w')
-        self._plots_title_lbl.grid(row=2, column=0, sticky='w')
+        self._update_all_btn.grid(row=2, column=0, sticky='w')
+        self._plots_title_lbl.grid(row=3, column=0, sticky='w')
 
     def _configure_grid(self):
         self.grid_columnconfigure(1, weight=1)
 
     def add_plot(self):
-        plot = PlotDataFrame(self, self._c,
-            PlotType.str_to_plottype(self._type_cmb.get()))
+        self.load_plot(self._type_cmb.get())
+
+    def load_plot(self, plot_type, plot_args=None):
+        """
+        Adds a plot of plot_type, with its options set from plot_args if
+        given, and returns its key.
+        """
+        plot = PlotDataFrame(self, self._c, plot_type)
         self._plots[plot.key] = plot
         self._c.add_plot(plot.key, plot._type)
+        if plot_args is not None:
+            plot.set_plot_args(plot_args)
         plot.grid(sticky='w', columnspan=2, pady=2)
+        return plot.key
+
+    def remove_plot(self, key):
+        self._plots.pop(key).destroy()
+
+    def clear_plots(self):
+        for key in list(self._plots):
+            self.remove_plot(key)
+
+    def get_plot_keys(self):
+        return list(self._plots)
+
+    def get_plot_type(self, key):
+        return self._plots[key]._type
+
+    def update_all_plots(self):
+        self._c.update_plots(list(self._plots))
 
     def get_plot_args(self, key):
         try:
@@ -44,14 +72,19 @@ class MainPlotOptionsFrame(st.SubFrame):
         except tk.TclError:
             self._c.message("Error", "Range values must be a number.")
 
+    def set_plot_busy(self, key, busy):
+        if key in self._plots:
+            self._plots[key].set_busy(busy)
+
 
 class PlotOptionsFrame(st.SubSubFrame):
     """
     Inheriting from this class passes plot arguments to the child frame
     """
     def __init__(self, parent, controller, plot_type, display_args=None):
+        # Plot types are identified by the name of their plot function
         self._type = plot_type
-        self._type_string = PlotType.to_string(self._type)
+        self._type_string = plot_type
         if display_args is None:
             display_args = controller.get_user_options(self._type)
         self._display_args = display_args
@@ -97,6 +130,22 @@ class PlotDataFrame(PlotOptionsFrame):
         if self._display_args.show_yrange:
             return self._data_options.yrange.max_entry.get()
 
+    def set_plot_args(self, plot_args):
+        self._data_options.xvar_cmb.set(plot_args.xvar)
+        self._data_options.yvar_cmb.set(plot_args.yvar)
+        if self._display_args.show_xrange:
+            self._data_options.xrange.set_range(plot_args.xmin,
+                                                plot_args.xmax)
+        if self._display_args.show_yrange:
+            self._data_options.yrange.set_range(plot_args.ymin,
+                                                plot_args.ymax)
+
+    def set_busy(self, busy):
+        self._actions.set_busy(busy)
+
+    def remove(self):
+        self._parent.remove_plot(self.key)
+
 
 class DataOptionsFrame(PlotOptionsFrame):
     """
@@ -145,6 +194,13 @@ class PlotRangeFrame(st.SubSubFrame):
     def _pad_columns(self):
         pass
 
+    def set_range(self, var_min, var_max):
+        # Ranges which weren't saved keep their defaults
+        if var_min is not None:
+            self.min_entry.set(var_min)
+        if var_max is not None:
+            self.max_entry.set(var_max)
+
 
 class LineOptionsFrame(PlotOptionsFrame):
     """
@@ -167,23 +223,34 @@ class PlotActionsFrame(PlotOptionsFrame):
     def _create_widgets(self):
         self._update_btn = st.Button(self, "Redraw plot", self.update_plot)
         self._remove_btn = st.Button(self, "Remove plot", self.delete_plot)
+        self._status_lbl = st.Label(self, "")
 
     def _position_widgets(self):
         self._update_btn.grid(row=0, column=1)
         self._remove_btn.grid(row=0, column=2)
+        self._status_lbl.grid(row=0, column=3)
 
     def _create_optional_widgets(self):
         if self._display_args.show_set_constants is True:
             self._const_btn = st.Button(self, "Set constants", self.set_const)
             self._const_btn.grid(row=0, column=0)
+        if self._display_args.show_trace is True:
+            self._trace_btn = st.Button(self, "Show trace", self.show_trace)
+            self._trace_btn.grid(row=0, column=4)
 
     def set_const(self):
         self._c.set_const(self._parent.key, self._type)
 
+    def show_trace(self):
+        self._c.show_trace(self._parent.key)
+
     def update_plot(self):
         self._c.update_plot(self._parent.key)
 
     def delete_plot(self):
         self._c.delete_plot(self._parent.key)
-        self._parent.destroy()
+        self._parent.remove()
+
+    def set_busy(self, busy):
+        self._status_lbl.configure(text="Calculating..." if busy else "")
 
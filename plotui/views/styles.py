@@ -218,10 +218,11 @@ class BoolCheck(ttk.Checkbutton):
     """
     An entry that automatically creates its own observable values.
     """
-    def __init__(self, parent, text, value=False, style='TCheckbutton'):
+    def __init__(self, parent, text, value=False, style='TCheckbutton',
+            command=None):
         self._observable_var = tk.BooleanVar(value=value)
         ttk.Checkbutton.__init__(self, parent, text=text, style=style,
-            variable=self._observable_var)
+            variable=self._observable_var, command=command)
 
     def get(self):
         return self._observable_var.get()
@@ -246,6 +247,9 @@ class BaseObservableCombobox(ttk.Combobox):
     def get(self):
         return self._observable_var.get()
 
+    def set(self, value):
+        self._observable_var.set(value)
+
 class StringCombo(BaseObservableCombobox):
     def __init__(self, parent, values, width=12, style='TCombobox'):
         super().__init__(parent, tk.StringVar, values, width, style)
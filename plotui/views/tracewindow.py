@@ -0,0 +1,101 @@
+import tkinter as tk
+from tkinter import ttk
+
+import views.styles as st
+
+# The most recent rows shown in the table, the export contains every row
+MAX_ROWS = 1000
+
+
+class TraceWindow(tk.Toplevel):
+    def __init__(self, parent, controller, key, tables):
+        tk.Toplevel.__init__(self, parent)
+        self.title("Model trace")
+        self._frame = MainFrame(self, controller, key, tables)
+        self._frame.grid(sticky="nsew")
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+
+
+class MainFrame(st.MainFrame):
+    def __init__(self, parent, controller, key, tables):
+        self._key = key
+        self._tables = tables
+        super().__init__(parent, controller)
+
+    def _create_widgets(self):
+        # A tab for each table, given as (name, rows, recorded)
+        self._notebook = ttk.Notebook(self)
+        for name, rows, recorded in self._tables:
+            self._notebook.add(TableFrame(self._notebook, self._c, rows,
+                recorded), text=name.capitalize())
+        self._actions_frame = ActionsFrame(self, self._c)
+
+    def _position_widgets(self):
+        self._notebook.grid(row=0, column=0, sticky="nsew")
+        self._actions_frame.grid(row=1, column=0, sticky="nsew")
+
+    def _configure_grid(self):
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+
+    def export(self, file_name):
+        self._c.export_model_trace(self._key, file_name)
+
+    def destroy_window(self):
+        self._parent.destroy()
+
+
+class TableFrame(st.SubSubFrame):
+    def __init__(self, parent, controller, rows, recorded):
+        self._rows = rows
+        self._recorded = recorded
+        super().__init__(parent, controller)
+
+    def _create_widgets(self):
+        fields = self._rows.dtype.names
+        shown = self._rows[-MAX_ROWS:]
+        self._count_lbl = st.Label(self, f"Showing {len(shown)} of "
+            f"{len(self._rows)} rows ({self._recorded} recorded)")
+        self._table = ttk.Treeview(self, columns=fields, show='headings',
+            height=20)
+        for field in fields:
+            self._table.heading(field, text=field)
+            self._table.column(field, width=70, anchor='e')
+        for row in shown:
+            self._table.insert('', 'end', values=[f"{val:.6g}" for val
+                                                  in row])
+        self._yscroll = ttk.Scrollbar(self, orient='vertical',
+            command=self._table.yview)
+        self._xscroll = ttk.Scrollbar(self, orient='horizontal',
+            command=self._table.xview)
+        self._table.configure(yscrollcommand=self._yscroll.set,
+            xscrollcommand=self._xscroll.set)
+
+    def _position_widgets(self):
+        self._count_lbl.grid(row=0, column=0, sticky='w')
+        self._table.grid(row=1, column=0, sticky='nsew')
+        self._yscroll.grid(row=1, column=1, sticky='ns')
+        self._xscroll.grid(row=2, column=0, sticky='ew')
+
+    def _configure_grid(self):
+        self.rowconfigure(1, weight=1)
+        self.columnconfigure(0, weight=1)
+
+
+class ActionsFrame(st.SubSubFrame):
+    def _create_widgets(self):
+        self._file_le = st.StringLabEnt(self, "File name:", "trace")
+        self._export_btn = st.Button(self, "Export", self.export)
+        self._close_btn = st.Button(self, "Close", self.close)
+
+    def _position_widgets(self):
+        self._file_le.grid(row=0, column=0)
+        self._export_btn.grid(row=0, column=1)
+        self._close_btn.grid(row=0, column=2)
+
+    def export(self):
+        self._parent.export(self._file_le.get())
+
+    def close(self):
+        self._parent.destroy_window()
@@ -1,3 +1,4 @@
+import time
 import tkinter as tk
 from tkinter import ttk
 from tkinter.font import Font
@@ -7,18 +8,37 @@ from views.mainwindow import MainWindowFrame
 
 class View(tk.Tk):
     """
-    The root level element.
+    The root level element. start_time is the perf_counter time the
+    program started, from which the startup time is measured.
     """
-    def __init__(self):
+    def __init__(self, start_time=None):
         super().__init__()
+        if start_time is None:
+            start_time = time.perf_counter()
 
         self._create_styles()
 
         self.main_frame = MainWindowFrame(self)
         self.main_frame.grid()
+        self.protocol('WM_DELETE_WINDOW', self._close)
+
+        # Show the window before loading the plot, which imports matplotlib
+        self.update()
+        window_time = time.perf_counter() - start_time
+        self.after_idle(self._load_plot, start_time, window_time)
 
         self.mainloop()
 
+    def _load_plot(self, start_time, window_time):
+        self.main_frame.load_plot()
+        plot_time = time.perf_counter() - start_time
+        self.main_frame.show_startup_time(window_time, plot_time)
+
+    def _close(self):
+        # Background calculations are stopped before the window goes
+        self.main_frame.close()
+        self.destroy()
+
     def _create_styles(self):
         self.s = ttk.Style()
 